@@ -1,236 +1,638 @@
-import re
+import os
+import time
+import asyncio
+import importlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from sentence_transformers import SentenceTransformer, util
-import language_tool_python
-from collections import Counter
+import config
+import rubric as rubric_module
+from scoring_plan import compile_plan, with_topic_index
+from result_cache import ResultCache
+from grammar_pool import LanguageToolPool, PoolSaturated, PoolTimeout
+from grammar_cache import GrammarCache, check_incremental, match_dict
+from document import ParsedDocument
+from components import LazyComponent
+from deadline import Deadline
+from embeddings import load_backend, backend_id, EmbeddingBatcher
+from metrics import (STAGE_SECONDS, ANALYSIS_SECONDS, GRAMMAR_FALLBACKS, DEGRADED, CACHE_LOOKUPS,
+                     GRAMMAR_SENTENCES, TRANSCRIPT_WORDS, TRANSCRIPT_CHARS)
 
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-    nltk.download('vader_lexicon', quiet=True)
-    nltk.download('punkt_tab', quiet=True)
+def ensure_nltk_data():
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt', quiet=True)
+        nltk.download('vader_lexicon', quiet=True)
+        nltk.download('punkt_tab', quiet=True)
 
 class TranscriptAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: ResultCache = None, parallel: bool = None, lazy: bool = False):
+        """With lazy=True heavy components load in background threads once
+        start_loading() is called; otherwise they are loaded here, concurrently."""
         print("Initializing analyzer models...")
-        self.sia = SentimentIntensityAnalyzer()
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight model
-        self.grammar_tool = language_tool_python.LanguageTool('en-US')
-        self.filler_words = ['um', 'uh', 'like', 'you know', 'so', 'actually', 
-                            'basically', 'right', 'i mean', 'well', 'kinda', 
-                            'sort of', 'okay', 'hmm', 'ah']
-        print("Analyzer ready.")
-    
-    def analyze(self, transcript: str, duration_sec: int = None):
+        self._components = {
+            "nltk": LazyComponent("nltk", ensure_nltk_data),
+            "sentiment": LazyComponent("sentiment", self._load_sentiment),
+            "embedding": LazyComponent("embedding", self._load_embedding),
+            "grammar": LazyComponent("grammar", self._load_grammar),
+        }
+        self.warmup = LazyComponent("warmup", self._warm_up)
+        #identifies the embedding backend in topic index files and result cache keys
+        self.embedding_id = backend_id(config.EMBEDDING_BACKEND, config.MODEL_NAME)
+        
+        #all phrases, thresholds and topic embeddings come from the compiled rubric;
+        #topic embeddings are attached once the embedding model has loaded
+        self._reload_lock = threading.Lock()
+        self.plan = self._compile_plan(rubric_module.RUBRIC, rubric_module.TOPIC_PARAPHRASES)
+        self.cache = cache
+        #LanguageTool matches per sentence, so resubmitted drafts only re-check edited sentences
+        self.grammar_cache = None
+        if config.GRAMMAR_CACHE_SIZE > 0:
+            self.grammar_cache = GrammarCache(config.GRAMMAR_CACHE_SIZE, config.GRAMMAR_CACHE_DB or None)
+        
+        #independent slow stages (LanguageTool, embedding, VADER) can run side by side
+        self.parallel = config.PARALLEL_STAGES if parallel is None else parallel
+        self._start_executors()
+        self._watch_interval = None
+        
+        self.lazy = lazy
+        if lazy:
+            print("Analyzer created; models load in the background.")
+        else:
+            for component in self._components.values():
+                component.start()
+            for component in self._components.values():
+                component.wait()
+            print("Analyzer ready.")
+    
+    def _start_executors(self):
+        self._stage_executor = ThreadPoolExecutor(max_workers=config.STAGE_WORKERS,
+                                                  thread_name_prefix="analyzer-stage")
+        #separate pool for whole requests so they never wait on their own stage slots
+        self._request_executor = ThreadPoolExecutor(max_workers=config.REQUEST_WORKERS,
+                                                    thread_name_prefix="analyzer-request")
+    
+    def after_fork(self, threads: int = 0):
+        """Rebuild per-process state in a worker forked from a loaded analyzer (see serve.py).
+        
+        Models, the compiled plan and cache contents are inherited and stay shared
+        copy-on-write. Threads, locks and SQLite connections do not survive fork(),
+        so executors, the LanguageTool pool and cache connections are recreated.
+        threads caps the embedding runtime's intra-op threads (0 = its default).
+        """
+        self._reload_lock = threading.Lock()
+        self._start_executors()
+        for cache in (self.cache, self.grammar_cache):
+            if cache is not None:
+                cache.after_fork()
+        grammar = self._components["grammar"]
+        if grammar.ready:
+            grammar.value.after_fork()
+        embedding = self._components["embedding"]
+        if embedding.ready:
+            embedding.value.after_fork(threads)
+        if self._watch_interval:
+            self.watch_rubric(self._watch_interval)
+    
+    #heavy imports live inside the loaders so importing this module stays fast
+    def _load_sentiment(self):
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        self._components["nltk"].get()
+        return SentimentIntensityAnalyzer()
+    
+    def _load_embedding(self):
+        model = load_backend(config.EMBEDDING_BACKEND, config.MODEL_NAME, config.ONNX_MODEL_DIR,
+                             config.ONNX_THREADS, config.CACHE_DIR)
+        if config.EMBEDDING_BATCH_MAX > 1:
+            #concurrent requests share model calls instead of each encoding one text
+            model = EmbeddingBatcher(model, config.EMBEDDING_BATCH_MAX, config.EMBEDDING_BATCH_WAIT_MS / 1000)
+        self._with_topic_index(self.plan, model)
+        return model
+    
+    def _load_grammar(self):
+        return LanguageToolPool.from_config(
+            urls=config.LT_URLS, size=config.LT_POOL_SIZE,
+            max_queue=config.LT_MAX_QUEUE, timeout=config.LT_TIMEOUT
+        )
+    
+    def _warm_up(self):
+        """One uncached analysis so the first real request doesn't pay for lazy initialization"""
+        for component in self._components.values():
+            component.get()
+        self.analyze(rubric_module.SAMPLE_EXPECTED["transcript"], use_cache=False)
+    
+    def start_loading(self, warm_up: bool = True):
+        """Start loading every component in the background, then warm up"""
+        for component in self._components.values():
+            component.start()
+        if warm_up:
+            self.warmup.start()
+    
+    def status(self):
+        """Per-component load state; ready once everything is loaded and warm-up has finished"""
+        components = {name: c.status() for name, c in self._components.items()}
+        components["warmup"] = self.warmup.status()
+        ready = (all(c.ready for c in self._components.values())
+                 and self.warmup.state in ("ready", "failed"))
+        return {"ready": ready, "components": components}
+    
+    @property
+    def model(self):
+        return self._components["embedding"].get()
+    
+    @property
+    def sia(self):
+        return self._components["sentiment"].get()
+    
+    @property
+    def grammar_pool(self):
+        return self._components["grammar"].get()
+    
+    def _compile_plan(self, rubric, paraphrases):
+        embedding = self._components["embedding"]
+        encoder = embedding.value if embedding.ready else None
+        return compile_plan(rubric, encoder, self.embedding_id, config.CACHE_DIR,
+                            config.TOPIC_PARAPHRASES, paraphrases)
+    
+    def _with_topic_index(self, plan, model):
+        """Attach topic embeddings to plan, updating the live plan if it is still current"""
+        full = with_topic_index(plan, model, self.embedding_id, config.CACHE_DIR)
+        with self._reload_lock:
+            if self.plan is plan:
+                self.plan = full
+        return full
+    
+    def _parse(self, text, plan):
+        self._components["nltk"].get()
+        return ParsedDocument(text, plan.matcher)
+    
+    @property
+    def rubric_version(self):
+        return self.plan.version
+    
+    def reload_plan(self, rubric=None):
+        """Compile a new scoring plan and swap it in atomically.
+        
+        With no argument, rubric.py is re-imported from disk. Requests already
+        running finish with the plan they started with; if compiling fails the
+        current plan stays in place and the error is raised.
+        """
+        with self._reload_lock:
+            if rubric is None:
+                module = importlib.reload(rubric_module)
+                rubric, paraphrases = module.RUBRIC, module.TOPIC_PARAPHRASES
+            else:
+                paraphrases = rubric_module.TOPIC_PARAPHRASES
+            plan = self._compile_plan(rubric, paraphrases)
+            self.plan = plan
+        print(f"Rubric plan {plan.version} active.")
+        return plan.version
+    
+    def watch_rubric(self, interval: float = 2.0):
+        """Poll rubric.py in a daemon thread and reload the plan when it changes"""
+        path = rubric_module.__file__
+        self._watch_interval = interval
+        
+        def watch():
+            last = os.path.getmtime(path)
+            while True:
+                time.sleep(interval)
+                try:
+                    mtime = os.path.getmtime(path)
+                    if mtime != last:
+                        last = mtime
+                        self.reload_plan()
+                except Exception as e:
+                    print(f"Rubric reload error: {e}")
+        
+        threading.Thread(target=watch, name="rubric-watcher", daemon=True).start()
+    
+    def analyze(self, transcript: str, duration_sec: int = None, use_cache: bool = True,
+                include_timings: bool = False, budget_ms: float = None, deadline: Deadline = None):
+        """Score one transcript. include_timings adds a per-stage "timings" block.
+        
+        With a latency budget (budget_ms, else ANALYZER_BUDGET_MS) slow stages that
+        cannot finish in time fall back to cheaper checks; see "degraded" in the result.
+        Pass deadline instead to count time already spent, e.g. queueing.
+        """
+        start = time.perf_counter()
+        if deadline is None:
+            deadline = Deadline.from_ms(config.BUDGET_MS if budget_ms is None else budget_ms)
+        plan = self.plan
         text = transcript.strip()
-        
-        #NLTK Tokenization
-        sentences = sent_tokenize(text)
-        words = word_tokenize(text.lower())
-        word_count = len([w for w in words if w.isalnum()])
+        key = self._cache_key(plan, text, duration_sec) if use_cache else None
+        if key:
+            cached = self.cache.get(key)
+            CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+            if cached is not None:
+                return self._finish(cached, {}, start, "hit", include_timings)
+        
+        timings = {}
+        doc = self._timed("parse", timings, self._parse, text, plan)
+        result = self._analyze_doc(doc, plan, duration_sec, timings=timings, deadline=deadline,
+                                   use_cache=use_cache)
+        if key and self._cacheable(result):
+            self.cache.put(key, result)
+        return self._finish(result, timings, start, "miss" if key else "off", include_timings)
+    
+    def _timed(self, stage, timings, fn, *args):
+        """Call fn, recording its duration in the stage histogram (and in timings, if given)"""
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.observe(elapsed, stage=stage)
+            if timings is not None:
+                timings[stage] = round(elapsed * 1000, 3)
+    
+    def _finish(self, result, timings, start, cache_state, include_timings):
+        elapsed = time.perf_counter() - start
+        ANALYSIS_SECONDS.observe(elapsed, cache=cache_state)
+        if include_timings:
+            #cached results never carry timings; they are added to a copy per request
+            result = dict(result, timings={"total_ms": round(elapsed * 1000, 3), "cache": cache_state,
+                                           "stages_ms": dict(timings)})
+        return result
+    
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Run fn on the bounded request executor without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._request_executor, functools.partial(fn, *args, **kwargs))
+    
+    async def analyze_async(self, transcript: str, duration_sec: int = None, use_cache: bool = True,
+                            include_timings: bool = False, budget_ms: float = None):
+        #the budget starts now, so time spent waiting for a request worker counts against it
+        deadline = Deadline.from_ms(config.BUDGET_MS if budget_ms is None else budget_ms)
+        return await self.run_blocking(self.analyze, transcript, duration_sec, use_cache=use_cache,
+                                       include_timings=include_timings, deadline=deadline)
+    
+    async def analyze_batch_async(self, items, batch_size: int = 32, use_cache: bool = True):
+        return await self.run_blocking(self.analyze_batch, items, batch_size, use_cache=use_cache)
+    
+    def stream_session(self):
+        """Incremental scorer for a transcript that arrives in chunks"""
+        from streaming import StreamingSession
+        return StreamingSession(self, self.plan)
+    
+    def _cache_key(self, plan, text, duration_sec):
+        if self.cache is None:
+            return None
+        #settings that change scores without changing the rubric or the model
+        settings = (config.TOPIC_PARAPHRASES, config.SEMANTIC_CHUNKING, config.SEMANTIC_CHUNK_MIN_WORDS,
+                    config.SEMANTIC_TOP_K)
+        return ResultCache.make_key(text, duration_sec, plan.version, self.embedding_id, settings)
+    
+    def _cacheable(self, result):
+        #a LanguageTool outage or a tight budget should not pin a cheaper result in the cache
+        return (not result.get("degraded")
+                and all(c["details"].get("method") != "basic" for c in result["criteria_scores"]))
+    
+    def analyze_batch(self, items, batch_size: int = 32, use_cache: bool = True):
+        """Analyze many transcripts with a single batched embedding pass.
+        
+        items: list of transcript strings, (transcript, duration_sec) pairs or
+        (transcript, duration_sec, use_cache) triples.
+        Returns one entry per item, in input order: {"index", "result", "error"}.
+        """
+        plan = self.plan
+        texts, durations, keys, use_caches = [], [], [], []
+        for item in items:
+            if isinstance(item, str):
+                item = (item,)
+            transcript = item[0]
+            duration = item[1] if len(item) > 1 else None
+            item_cache = item[2] if len(item) > 2 else use_cache
+            text = (transcript or "").strip()
+            texts.append(text)
+            durations.append(duration)
+            use_caches.append(item_cache)
+            keys.append(self._cache_key(plan, text, duration) if item_cache else None)
+        
+        cached = {}
+        for i, key in enumerate(keys):
+            if key:
+                hit = self.cache.get(key)
+                CACHE_LOOKUPS.inc(result="miss" if hit is None else "hit")
+                if hit is not None:
+                    cached[i] = hit
+        
+        docs, failed = {}, {}
+        for i, text in enumerate(texts):
+            if i not in cached:
+                try:
+                    docs[i] = self._timed("parse", None, self._parse, text, plan)
+                except Exception as e:
+                    failed[i] = str(e)
+        
+        #only transcripts missing a must-have topic lexically need the model;
+        #chunked ones are encoded sentence by sentence in _score_keywords_semantic
+        pending = [i for i, doc in docs.items()
+                   if doc.text and self._missing_must_have(doc, plan) and not self._chunked(doc)]
+        embeddings = {}
+        if pending:
+            try:
+                with STAGE_SECONDS.time(stage="batch_embedding"):
+                    encoded = self.model.encode([texts[i] for i in pending], batch_size=batch_size,
+                                                normalize_embeddings=True)
+                embeddings = {i: encoded[pos] for pos, i in enumerate(pending)}
+            except Exception as e:
+                #per-item encoding happens in _score_keywords_semantic instead
+                print(f"Batch encoding error: {e}")
+        
+        results = []
+        for i in range(len(texts)):
+            if i in failed:
+                results.append({"index": i, "result": None, "error": failed[i]})
+                continue
+            if i in cached:
+                results.append({"index": i, "result": cached[i], "error": None})
+                continue
+            try:
+                result = self._analyze_doc(docs[i], plan, durations[i], embeddings.get(i), use_cache=use_caches[i])
+                if keys[i] and self._cacheable(result):
+                    self.cache.put(keys[i], result)
+                results.append({"index": i, "result": result, "error": None})
+            except Exception as e:
+                results.append({"index": i, "result": None, "error": str(e)})
+        return results
+    
+    def _analyze_doc(self, doc: ParsedDocument, plan, duration_sec: int = None, embedding=None, timings=None,
+                     deadline: Deadline = None, use_cache: bool = True):
+        word_count = doc.word_count
+        TRANSCRIPT_WORDS.observe(word_count)
+        TRANSCRIPT_CHARS.observe(len(doc.text))
         
         if not duration_sec:
-            duration_sec = max(30, word_count // 2)
-        
-        criteria_results = []
+            duration_sec = self._default_duration(word_count, plan)
+        
+        #slow, independent stages are started first so they overlap with the cheap ones;
+        #under a deadline they always run as futures so waiting on them can be cut short
+        use_futures = self.parallel or deadline is not None
+        if use_futures:
+            submit = self._stage_executor.submit
+            kw_future = submit(self._timed, "keywords", timings, self._score_keywords_semantic,
+                               doc, plan, embedding, deadline)
+            gram_future = submit(self._timed, "grammar", timings, self._score_grammar_languagetool,
+                                 doc, plan, deadline, use_cache)
+            sent_future = submit(self._timed, "sentiment", timings, self._score_sentiment, doc, plan)
         
         #1. CONTENT & STRUCTURE (40%)
-        sal_result = self._score_salutation(text)
-        criteria_results.append(sal_result)
-        
-        kw_result = self._score_keywords_semantic(text)
-        criteria_results.append(kw_result)
-        
-        flow_result = self._score_flow(text)
-        criteria_results.append(flow_result)
+        sal_result = self._timed("salutation", timings, self._score_salutation, doc, plan)
+        flow_result = self._timed("flow", timings, self._score_flow, doc, plan)
         
         #2. SPEECH RATE (10%)
         wpm = (word_count / duration_sec) * 60
-        sr_result = self._score_speech_rate(wpm, duration_sec)
-        criteria_results.append(sr_result)
+        sr_result = self._timed("speech_rate", timings, self._score_speech_rate, wpm, duration_sec, plan)
         
         #3. LANGUAGE & GRAMMAR (20%)
-        gram_result = self._score_grammar_languagetool(text, word_count)
-        criteria_results.append(gram_result)
-        
-        ttr_result = self._score_vocabulary(words)
-        criteria_results.append(ttr_result)
+        ttr_result = self._timed("vocabulary", timings, self._score_vocabulary, doc, plan)
         
         #4. CLARITY (15%)
-        filler_result = self._score_filler_words(text, word_count)
-        criteria_results.append(filler_result)
+        filler_result = self._timed("filler_words", timings, self._score_filler_words, doc, plan)
+        
+        if use_futures:
+            kw_result = self._await_stage(
+                kw_future, deadline, lambda: self._degrade(self._score_keywords_lexical(doc, plan), "deadline"))
+            gram_result = self._await_stage(
+                gram_future, deadline, lambda: self._grammar_fallback(doc, plan, "deadline"))
+            sent_result = sent_future.result()
+        else:
+            kw_result = self._timed("keywords", timings, self._score_keywords_semantic, doc, plan, embedding)
+            gram_result = self._timed("grammar", timings, self._score_grammar_languagetool, doc, plan,
+                                      None, use_cache)
+            #5. ENGAGEMENT (15%)
+            sent_result = self._timed("sentiment", timings, self._score_sentiment, doc, plan)
         
-        #5. ENGAGEMENT (15%)
-        sent_result = self._score_sentiment(text)
-        criteria_results.append(sent_result)
+        criteria_results = [sal_result, kw_result, flow_result, sr_result,
+                            gram_result, ttr_result, filler_result, sent_result]
         
+        return self._combine(criteria_results, word_count, doc.sentence_count, plan)
+    
+    def _await_stage(self, future, deadline, fallback):
+        """Result of a stage future, or fallback() if the deadline passes first"""
+        if deadline is None:
+            return future.result()
+        try:
+            return future.result(timeout=deadline.remaining())
+        except FutureTimeout:
+            #an embedding pass cannot be interrupted; it finishes in the background and is dropped
+            future.cancel()
+            return fallback()
+    
+    def _degrade(self, result, reason):
+        """Mark a criterion as computed by a cheaper fallback path"""
+        result["details"]["degraded"] = reason
+        DEGRADED.inc(metric=result["metric"], reason=reason)
+        return result
+    
+    def _default_duration(self, word_count, plan):
+        return max(plan.default_min_seconds, int(word_count // plan.default_words_per_second))
+    
+    def _combine(self, criteria_results, word_count, sentence_count, plan):
         overall = sum(c['weighted_score'] for c in criteria_results)
         
         return {
             "overall_score": round(overall, 1),
             "word_count": word_count,
-            "sentence_count": len(sentences),
+            "sentence_count": sentence_count,
             "criteria_scores": criteria_results,
-            "summary": self._generate_summary(overall, criteria_results)
+            "summary": self._generate_summary(overall, criteria_results, plan),
+            #metrics scored by a fallback (deadline, LanguageTool unavailable) rather than the full check
+            "degraded": [c["metric"] for c in criteria_results if c["details"].get("degraded")]
         }
     
-    def _score_salutation(self, text):
-        text_lower = text.lower()
+    #each _score_* method measures the document; the matching _*_result method turns
+    #the measurement into a criterion result, so incremental scoring can reuse it
+    def _score_salutation(self, doc, plan):
+        return self._salutation_result({hit.label for hit in doc.hits.get("salutation", [])}, plan)
+    
+    def _salutation_result(self, levels_found, plan):
         score = 0
         found = "None"
         
-        excellent = ["i am excited to introduce", "feeling great"]
-        good = ["good morning", "good afternoon", "good evening", "hello everyone"]
-        normal = ["hi", "hello"]
-        
-        if any(s in text_lower for s in excellent):
-            score, found = 5, "Excellent"
-        elif any(s in text_lower for s in good):
-            score, found = 4, "Good"
-        elif any(s in text_lower for s in normal):
-            score, found = 2, "Normal"
+        for label, level_score in plan.salutation_levels:
+            if label in levels_found:
+                score, found = level_score, label
+                break
         
         return {
             "criterion": "Content & Structure",
             "metric": "Salutation Level",
             "score": score,
-            "max_score": 5,
-            "weight": 5,
+            "max_score": plan.salutation_weight,
+            "weight": plan.salutation_weight,
             "weighted_score": score,
             "feedback": f"Salutation type: {found}",
             "details": {"type_found": found}
         }
     
-    def _score_keywords_semantic(self, text):
+    def _missing_must_have(self, doc, plan):
+        found = {hit.label for hit in doc.hits.get("must_have", [])}
+        return any(category not in found for category in plan.must_have)
+    
+    def _score_keywords_semantic(self, doc, plan, embedding=None, deadline=None):
         """Enhanced keyword detection using semantic similarity"""
-        text_lower = text.lower()
-        
-        must_have_keywords = {
-            "name": ["name", "myself", "i am", "i'm"],
-            "age": ["age", "years old", "year old"],
-            "school": ["school", "college", "university", "class"],
-            "family": ["family", "parents", "mother", "father", "siblings"],
-            "hobbies": ["hobby", "hobbies", "enjoy", "like to", "love to", "play"]
-        }
-        
-        good_to_have = {
-            "goals": ["dream", "goal", "ambition", "want to", "aspire"],
-            "unique": ["fun fact", "unique", "special", "different"],
-            "achievements": ["achievement", "strength", "good at"]
-        }
-        
+        must_hits = {hit.label for hit in doc.hits.get("must_have", [])}
+        good_hits = {hit.label for hit in doc.hits.get("good_to_have", [])}
+        
+        similarities = matched = None
+        if any(category not in must_hits for category in plan.must_have):
+            if deadline is not None and not deadline.allows(config.DEADLINE_MIN_STAGE_MS / 1000):
+                return self._degrade(self._score_keywords_lexical(doc, plan), "deadline")
+            model = self.model
+            #timed on its own so model time can be told apart from the lexical matching
+            with STAGE_SECONDS.time(stage="embedding"):
+                if self._chunked(doc):
+                    #the model truncates long inputs, so score each sentence and keep the best
+                    best = self._topic_index(plan).best_matches(
+                        model, doc.sentences, config.SEMANTIC_CHUNK_BATCH, config.SEMANTIC_TOP_K)
+                    similarities = {topic: score for topic, (score, _) in best.items()}
+                    matched = {topic: doc.sentences[i] for topic, (_, i) in best.items()}
+                else:
+                    if embedding is None:
+                        embedding = model.encode(doc.text, normalize_embeddings=True)
+                    similarities = self._topic_similarities(embedding, plan)
+        
+        return self._keyword_result(must_hits, good_hits, similarities, plan, matched)
+    
+    def _score_keywords_lexical(self, doc, plan):
+        """Keyword presence from phrase matches only, without the embedding model"""
+        must_hits = {hit.label for hit in doc.hits.get("must_have", [])}
+        good_hits = {hit.label for hit in doc.hits.get("good_to_have", [])}
+        result = self._keyword_result(must_hits, good_hits, None, plan)
+        result["details"]["method"] = "lexical"
+        return result
+    
+    def _chunked(self, doc):
+        mode = config.SEMANTIC_CHUNKING
+        if mode == "auto":
+            return doc.word_count > config.SEMANTIC_CHUNK_MIN_WORDS and doc.sentence_count > 1
+        return mode == "on" and doc.sentence_count > 0
+    
+    def _topic_index(self, plan):
+        return plan.topic_index or self._with_topic_index(plan, self.model).topic_index
+    
+    def _topic_similarities(self, embedding, plan):
+        #one matrix-vector product against all precomputed topic embeddings
+        return self._topic_index(plan).similarities(embedding)
+    
+    def _keyword_result(self, must_hits, good_hits, similarities, plan, matched=None):
         must_score = 0
         must_found = []
+        semantic_matches = {}
         
-        for category, keywords in must_have_keywords.items():
-            if any(kw in text_lower for kw in keywords):
-                must_score += 4
+        for category in plan.must_have:
+            if category in must_hits:
+                must_score += plan.must_per_item
                 must_found.append(category)
         
-        if len(must_found) < 5:
-            embedding = self.model.encode(text, convert_to_tensor=True)
-            
-            for category in ["name", "age", "school", "family", "hobbies"]:
+        if similarities is not None:
+            for category in plan.must_have:
                 if category not in must_found:
-                    query = f"student's {category}"
-                    query_emb = self.model.encode(query, convert_to_tensor=True)
-                    similarity = util.cos_sim(embedding, query_emb).item()
-                    
-                    if similarity > 0.3:  #threshold for semantic match
-                        must_score += 2  
+                    if similarities[category] > plan.semantic_threshold:
+                        must_score += plan.must_semantic_per_item
                         must_found.append(f"{category}(semantic)")
+                        if matched:
+                            semantic_matches[category] = {
+                                "similarity": round(similarities[category], 3),
+                                "sentence": matched[category]
+                            }
         
-        must_score = min(must_score, 20)
+        must_score = min(must_score, plan.must_max)
         
         good_score = 0
         good_found = []
-        for category, keywords in good_to_have.items():
-            if any(kw in text_lower for kw in keywords):
-                good_score += 2
+        for category in plan.good_to_have:
+            if category in good_hits:
+                good_score += plan.good_per_item
                 good_found.append(category)
-        good_score = min(good_score, 10)
+        good_score = min(good_score, plan.good_max)
         
         total = must_score + good_score
+        details = {"must_have_found": must_found, "good_to_have_found": good_found}
+        if semantic_matches:
+            details["semantic_matches"] = semantic_matches
         
         return {
             "criterion": "Content & Structure",
             "metric": "Keyword Presence",
             "score": total,
-            "max_score": 30,
-            "weight": 30,
+            "max_score": plan.keyword_weight,
+            "weight": plan.keyword_weight,
             "weighted_score": total,
             "feedback": f"Found {len(must_found)} essential topics, {len(good_found)} additional topics",
-            "details": {"must_have_found": must_found, "good_to_have_found": good_found}
+            "details": details
         }
     
-    def _score_flow(self, text):
-        text_lower = text.lower()
+    def _score_flow(self, doc, plan):
+        flow = plan.flow
+        closing_from = max(len(doc.lower) - flow["closing"]["within_last"], 0)
+        
+        has_greeting = any(h.end <= flow["greeting"]["within_first"] for h in doc.hits.get("greeting", []))
+        has_name_early = any(h.end <= flow["name"]["within_first"] for h in doc.hits.get("name_intro", []))
+        has_closing = any(h.start >= closing_from for h in doc.hits.get("closing", []))
+        return self._flow_result(has_greeting, has_name_early, has_closing, plan)
+    
+    def _flow_result(self, has_greeting, has_name_early, has_closing, plan):
         order_score = 0
+        flow = plan.flow
         
-        has_greeting = any(g in text_lower[:50] for g in ["hello", "hi", "good"])
-        has_name_early = any(n in text_lower[:100] for n in ["my name", "myself", "i am", "i'm"])
-        has_closing = any(c in text_lower[-100:] for c in ["thank", "that's all", "that is all"])
-        
-        if has_greeting: order_score += 2
-        if has_name_early: order_score += 2
-        if has_closing: order_score += 1
+        if has_greeting: order_score += flow["greeting"]["score"]
+        if has_name_early: order_score += flow["name"]["score"]
+        if has_closing: order_score += flow["closing"]["score"]
         
         return {
             "criterion": "Content & Structure",
             "metric": "Flow/Structure",
             "score": order_score,
-            "max_score": 5,
-            "weight": 5,
+            "max_score": plan.flow_weight,
+            "weight": plan.flow_weight,
             "weighted_score": order_score,
             "feedback": f"Structure: Greeting {has_greeting}, Name early {has_name_early}, Closing {has_closing}",
             "details": {"has_greeting": has_greeting, "has_name": has_name_early, "has_closing": has_closing}
         }
     
-    def _score_speech_rate(self, wpm, duration):
-        if wpm > 161: score = 2
-        elif wpm > 140: score = 6
-        elif wpm >= 111: score = 10
-        elif wpm >= 81: score = 6
-        else: score = 2
+    def _score_speech_rate(self, wpm, duration, plan):
+        score = plan.speech_bands.lookup(wpm)
         
-        ideal = "Ideal" if 111 <= wpm <= 140 else ("Too fast" if wpm > 140 else "Too slow")
+        low, high = plan.ideal_wpm
+        ideal = "Ideal" if low <= wpm <= high else ("Too fast" if wpm > high else "Too slow")
         
         return {
             "criterion": "Speech Rate",
             "metric": "Words Per Minute",
             "score": score,
-            "max_score": 10,
-            "weight": 10,
+            "max_score": plan.speech_weight,
+            "weight": plan.speech_weight,
             "weighted_score": score,
-            "feedback": f"WPM: {wpm:.0f} ({ideal}). Ideal: 111-140 WPM",
+            "feedback": f"WPM: {wpm:.0f} ({ideal}). Ideal: {low}-{high} WPM",
             "details": {"wpm": round(wpm, 1), "duration_used": duration, "category": ideal}
         }
     
-    def _score_grammar_languagetool(self, text, word_count):
-        """Enhanced grammar checking using LanguageTool"""
+    def _score_grammar_languagetool(self, doc, plan, deadline=None, use_cache=True):
+        """Enhanced grammar checking using LanguageTool; use_cache=False skips the sentence cache too"""
+        word_count = doc.word_count
+        grammar = self._components["grammar"]
+        if not grammar.ready and grammar.state != "pending":
+            #LanguageTool still starting (or failed to start): serve the basic check now
+            return self._grammar_fallback(doc, plan, "unavailable")
+        if deadline is not None and not deadline.allows(config.DEADLINE_MIN_STAGE_MS / 1000):
+            return self._grammar_fallback(doc, plan, "deadline")
         try:
-            matches = self.grammar_tool.check(text)
+            matches = self._grammar_matches(doc, deadline, use_cache)
             
-            #chk available attributes and filter accordingly
+            #issue types are read from whichever Match attribute is present (see match_dict)
             errors = []
             for m in matches:
-                #tried diff attribute names for error classif
-                issue_type = None
-                if hasattr(m, 'ruleIssueType'):
-                    issue_type = m.ruleIssueType
-                elif hasattr(m, 'category'):
-                    issue_type = m.category
-                elif hasattr(m, 'rule'):
-                    issue_type = getattr(m.rule, 'category', None)
-                
-                if issue_type is None or issue_type.lower() in ['grammar', 'misspelling', 'typographical', 'possible_typo', 'grammar_error']:
+                issue_type = m["issue_type"]
+                if issue_type is None or issue_type.lower() in plan.grammar_issue_types:
                     errors.append(m)
             
             if not errors:
-                errors = matches[:10] 
+                errors = matches[:plan.grammar_fallback_matches]
             
             error_count = len(errors)
             
@@ -238,18 +640,14 @@ class TranscriptAnalyzer:
             error_rate = (error_count / max(word_count / 100, 1))
             
             #score based on errors per 100 words
-            if error_rate <= 1: score = 10
-            elif error_rate <= 2: score = 8
-            elif error_rate <= 4: score = 6
-            elif error_rate <= 7: score = 4
-            else: score = 2
+            score = plan.grammar_bands.lookup(error_rate)
             
             return {
                 "criterion": "Language & Grammar",
                 "metric": "Grammar Score",
                 "score": score,
-                "max_score": 10,
-                "weight": 10,
+                "max_score": plan.grammar_weight,
+                "weight": plan.grammar_weight,
                 "weighted_score": score,
                 "feedback": f"Found {error_count} potential issues ({error_rate:.1f} per 100 words)",
                 "details": {
@@ -258,125 +656,135 @@ class TranscriptAnalyzer:
                     "method": "languagetool"
                 }
             }
+        except PoolSaturated as e:
+            if config.LT_ON_SATURATION == "reject":
+                raise
+            print(f"LanguageTool busy: {e}")
+            return self._grammar_fallback(doc, plan, "saturated")
+        except PoolTimeout as e:
+            print(f"LanguageTool timeout: {e}")
+            return self._grammar_fallback(doc, plan, "deadline" if deadline is not None else "timeout")
         except Exception as e:
             #fallback to basic grammar check if LanguageTool fails
             print(f"LanguageTool error: {e}")
-            return self._score_grammar_basic(text, word_count)
+            return self._grammar_fallback(doc, plan, "error")
+    
+    def _grammar_fallback(self, doc, plan, reason):
+        GRAMMAR_FALLBACKS.inc(reason=reason)
+        return self._degrade(self._score_grammar_basic(doc, plan), reason)
     
-    def _score_grammar_basic(self, text, word_count):
+    def _grammar_matches(self, doc, deadline=None, use_cache=True):
+        pool = self.grammar_pool
+        #one budget for the whole stage: every run check_incremental sends gets only what is left
+        deadline = deadline or Deadline(pool.timeout)
+        
+        def check(text):
+            if deadline.expired:
+                raise PoolTimeout("Grammar check budget spent")
+            return pool.check(text, timeout=deadline.remaining())
+        
+        if self.grammar_cache is None or not use_cache:
+            return [match_dict(m) for m in check(doc.text)]
+        matches, cached, checked = check_incremental(check, doc.text, doc.sentence_spans, self.grammar_cache)
+        GRAMMAR_SENTENCES.inc(cached, result="cached")
+        GRAMMAR_SENTENCES.inc(checked, result="checked")
+        return matches
+    
+    def _score_grammar_basic(self, doc, plan):
         """Fallback basic grammar check"""
+        word_count = doc.word_count
         errors = 0
-        sentences = sent_tokenize(text)
         
-        for sent in sentences:
+        for sent in doc.sentences:
             if sent and not sent[0].isupper(): errors += 1
             if sent and sent[-1] not in '.!?': errors += 1
         
-        error_patterns = [r'\bi is\b', r'\bhe are\b', r'\bthey is\b', r'\bwe is\b']
-        for pat in error_patterns:
-            errors += len(re.findall(pat, text.lower()))
+        for pat in plan.basic_patterns:
+            errors += len(pat.findall(doc.lower))
         
+        return self._grammar_basic_result(errors, word_count, plan)
+    
+    def _grammar_basic_result(self, errors, word_count, plan):
         error_rate = errors / max(word_count / 100, 1)
-        
-        if error_rate <= 1: score = 10
-        elif error_rate <= 2: score = 8
-        elif error_rate <= 4: score = 6
-        else: score = 4
+        score = plan.basic_bands.lookup(error_rate)
         
         return {
             "criterion": "Language & Grammar",
             "metric": "Grammar Score",
             "score": score,
-            "max_score": 10,
-            "weight": 10,
+            "max_score": plan.grammar_weight,
+            "weight": plan.grammar_weight,
             "weighted_score": score,
             "feedback": f"Basic check: ~{errors} issues",
-            "details": {"error_count": errors}
+            "details": {"error_count": errors, "method": "basic"}
         }
     
-    def _score_vocabulary(self, words):
-        alpha_words = [w for w in words if w.isalpha()]
-        if not alpha_words:
+    def _score_vocabulary(self, doc, plan):
+        return self._vocabulary_result(doc.alpha_unique, doc.alpha_count, plan)
+    
+    def _vocabulary_result(self, unique_words, total_words, plan):
+        if not total_words:
             return {
                 "criterion": "Language & Grammar",
                 "metric": "Vocabulary (TTR)",
                 "score": 0,
-                "max_score": 10,
-                "weight": 10,
+                "max_score": plan.ttr_weight,
+                "weight": plan.ttr_weight,
                 "weighted_score": 0,
                 "feedback": "No words found",
                 "details": {}
             }
         
-        ttr = len(set(alpha_words)) / len(alpha_words)
-        
-        if ttr >= 0.9: score = 10
-        elif ttr >= 0.7: score = 8
-        elif ttr >= 0.5: score = 6
-        elif ttr >= 0.3: score = 4
-        else: score = 2
+        ttr = unique_words / total_words
+        score = plan.ttr_bands.lookup(ttr)
         
         return {
             "criterion": "Language & Grammar",
             "metric": "Vocabulary Richness (TTR)",
             "score": score,
-            "max_score": 10,
-            "weight": 10,
+            "max_score": plan.ttr_weight,
+            "weight": plan.ttr_weight,
             "weighted_score": score,
             "feedback": f"TTR: {ttr:.2f}. Higher = more diverse vocabulary",
-            "details": {"ttr": round(ttr, 2), "unique_words": len(set(alpha_words)), "total_words": len(alpha_words)}
+            "details": {"ttr": round(ttr, 2), "unique_words": unique_words, "total_words": total_words}
         }
     
-    def _score_filler_words(self, text, word_count):
-        text_lower = text.lower()
-        filler_count = sum(text_lower.count(f' {f} ') + text_lower.count(f' {f},') for f in self.filler_words)
+    def _score_filler_words(self, doc, plan):
+        return self._filler_result(len(doc.hits.get("filler", [])), doc.word_count, plan)
+    
+    def _filler_result(self, filler_count, word_count, plan):
         filler_rate = (filler_count / max(word_count, 1)) * 100
-        
-        if filler_rate <= 3: score = 15
-        elif filler_rate <= 6: score = 12
-        elif filler_rate <= 9: score = 9
-        elif filler_rate <= 12: score = 6
-        else: score = 3
+        score = plan.filler_bands.lookup(filler_rate)
         
         return {
             "criterion": "Clarity",
             "metric": "Filler Word Rate",
             "score": score,
-            "max_score": 15,
-            "weight": 15,
+            "max_score": plan.filler_weight,
+            "weight": plan.filler_weight,
             "weighted_score": score,
             "feedback": f"Filler rate: {filler_rate:.1f}%. Found {filler_count} filler words",
             "details": {"filler_count": filler_count, "filler_rate": round(filler_rate, 2)}
         }
     
-    def _score_sentiment(self, text):
-        scores = self.sia.polarity_scores(text)
-        compound = scores['compound']
+    def _score_sentiment(self, doc, plan):
+        scores = self.sia.polarity_scores(doc.text)
+        return self._sentiment_result(scores['compound'], plan)
+    
+    def _sentiment_result(self, compound, plan):
         positivity = (compound + 1) / 2
-        
-        if positivity >= 0.9: score = 15
-        elif positivity >= 0.7: score = 12
-        elif positivity >= 0.5: score = 9
-        elif positivity >= 0.3: score = 6
-        else: score = 3
+        score = plan.sentiment_bands.lookup(positivity)
         
         return {
             "criterion": "Engagement",
             "metric": "Sentiment/Positivity",
             "score": score,
-            "max_score": 15,
-            "weight": 15,
+            "max_score": plan.sentiment_weight,
+            "weight": plan.sentiment_weight,
             "weighted_score": score,
             "feedback": f"Positivity: {positivity:.2f}. Compound sentiment: {compound:.2f}",
             "details": {"positivity": round(positivity, 2), "compound": compound}
         }
     
-    def _generate_summary(self, overall, criteria):
-        if overall >= 85:
-            return "Excellent introduction! Clear structure, good content coverage, and engaging delivery."
-        elif overall >= 70:
-            return "Good introduction with room for improvement. Consider adding more details or improving flow."
-        elif overall >= 50:
-            return "Satisfactory introduction. Focus on including more key information and improving structure."
-        else:
-            return "Needs improvement. Include essential details (name, age, school) and follow proper introduction flow."
\ No newline at end of file
+    def _generate_summary(self, overall, criteria, plan):
+        return plan.summary.lookup(overall)
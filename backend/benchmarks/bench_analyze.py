@@ -0,0 +1,50 @@
+"""End-to-end TranscriptAnalyzer.analyze latency.
+
+    python benchmarks/bench_analyze.py --lt-stub [--repeats 30] [--serial]
+
+Runs uncached analyses of each synthetic transcript and records latency
+percentiles per case. Writes results/analyze-<commit>.json.
+"""
+import time
+import argparse
+import common
+
+
+def main():
+    parser = common.add_common_args(argparse.ArgumentParser(description=__doc__.splitlines()[0]))
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--serial", action="store_true", help="run scoring stages one after another")
+    args = parser.parse_args()
+    if args.lt_stub:
+        common.use_lt_stub(args.lt_delay)
+
+    from analyzer import TranscriptAnalyzer
+    from synthetic import cases
+    start = time.perf_counter()
+    analyzer = TranscriptAnalyzer(parallel=not args.serial)
+    startup = time.perf_counter() - start
+    analyzer.analyze(next(cases([50]))[3], use_cache=False)
+
+    results = {"startup_seconds": round(startup, 3), "parallel": analyzer.parallel, "cases": []}
+    for label, words, profile, text in cases(common.parse_list(args.sizes, int),
+                                             common.parse_list(args.profiles), args.seed):
+        samples = []
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            result = analyzer.analyze(text, use_cache=False)
+            samples.append(time.perf_counter() - t0)
+        grammar = next(c for c in result["criteria_scores"] if c["criterion"] == "Language & Grammar")
+        stats = common.summarize(samples)
+        results["cases"].append({
+            "case": label, "words": words, "profile": profile,
+            "word_count": result["word_count"], "overall_score": result["overall_score"],
+            "grammar_method": grammar["details"].get("method", "languagetool"),
+            "latency_ms": stats
+        })
+        print(f"{label:>20}  p50={stats['p50']:.1f}ms  p95={stats['p95']:.1f}ms  p99={stats['p99']:.1f}ms")
+
+    print(f"Wrote {common.write_results('analyze', results, args)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""HTTP load test against the FastAPI app.
+
+    python benchmarks/bench_http.py --spawn --lt-stub [--concurrency 1,4,16] [--requests 200]
+    python benchmarks/bench_http.py --url http://127.0.0.1:8000
+
+With --spawn a uvicorn server is started for the run (with --lt-stub it uses
+the LanguageTool stub); otherwise --url must point at a running server. For
+each concurrency level, --requests POST /analyze calls are sent with
+use_cache=false, cycling through the synthetic transcripts. Records
+throughput, latency percentiles, status codes and the embedding batcher's
+batch sizes (GET /embedding/stats) to results/http-<commit>.json.
+Needs httpx (pip install httpx).
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+import common
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(args, command=None):
+    """Start uvicorn (or command(port)) in a subprocess and wait until /health/ready answers 200"""
+    import httpx
+    port = free_port()
+    env = dict(os.environ)
+    stub = None
+    if args.lt_stub:
+        stub = common.use_lt_stub(args.lt_delay)
+        env["ANALYZER_LT_URLS"] = os.environ["ANALYZER_LT_URLS"]
+    cmd = command(port) if command else [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                                         "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=common.BACKEND_DIR, env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"{url}/health/ready", timeout=2).status_code == 200:
+                return proc, url, stub
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"Server not ready after {args.startup_timeout}s")
+
+
+def fetch_json(url):
+    import httpx
+    try:
+        return httpx.get(url, timeout=10).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def run_level(url, payloads, concurrency, total, timeout):
+    import httpx
+    latencies, statuses, errors = [], Counter(), Counter()
+    counter = iter(range(total))
+
+    async def worker(client):
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/analyze", json=payloads[i % len(payloads)])
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": dict(errors),
+        "latency_ms": common.summarize(latencies),
+    }
+
+
+def main():
+    parser = common.add_common_args(argparse.ArgumentParser(description=__doc__.splitlines()[0]))
+    parser.set_defaults(sizes="50,200,1000")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start a server for the run")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    from synthetic import cases
+    payloads = [{"transcript": text, "use_cache": False}
+                for _, _, _, text in cases(common.parse_list(args.sizes, int),
+                                           common.parse_list(args.profiles), args.seed)]
+
+    proc = None
+    url = args.url
+    if args.spawn:
+        proc, url, _ = spawn_server(args)
+    try:
+        asyncio.run(run_level(url, payloads, 1, min(len(payloads), 5), args.timeout))  # warm-up
+        levels = []
+        for concurrency in common.parse_list(args.concurrency, int):
+            level = asyncio.run(run_level(url, payloads, concurrency, args.requests, args.timeout))
+            levels.append(level)
+            lat = level["latency_ms"]
+            print(f"c={concurrency:<4} {level['throughput_rps']:>8.2f} req/s  "
+                  f"p50={lat.get('p50', 0):.1f}ms  p99={lat.get('p99', 0):.1f}ms  status={level['status_codes']}")
+        embedding = fetch_json(f"{url}/embedding/stats")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    results = {"url": url, "transcripts": len(payloads), "levels": levels, "embedding": embedding}
+    print(f"Wrote {common.write_results('http', results, args)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Memory per worker: serve.py (shared preloaded models) against uvicorn --workers.
+
+    python benchmarks/bench_memory.py --lt-stub --workers 4                 # both servers, one after the other
+    python benchmarks/bench_memory.py --lt-stub --workers 4 --server serve
+    python benchmarks/bench_memory.py --pid 12345 --url http://127.0.0.1:8000   # an already running server
+
+Starts the server, waits for /health/ready, lets every worker finish loading
+(--settle), and sends --requests POST /analyze calls with one connection per
+worker. Memory of the server's process tree is read from
+/proc/<pid>/smaps_rollup before and after that load. Linux only.
+
+RSS counts shared pages in full in every process that maps them, so summing
+RSS over workers overstates the total. PSS splits each shared page between the
+processes sharing it, so the PSS total is what the whole server actually
+costs. With serve.py the model pages show up as Shared, not Private.
+LanguageTool's Java server is a separate process and is not counted. Writes
+results/memory-<commit>.json.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import common
+from bench_http import spawn_server, run_level
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_memory(pid):
+    """smaps_rollup fields in MiB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in FIELDS:
+                values[name] = int(rest.split()[0]) / 1024
+    return {
+        "rss_mib": round(values["Rss"], 1),
+        "pss_mib": round(values["Pss"], 1),
+        "shared_mib": round(values["Shared_Clean"] + values["Shared_Dirty"], 1),
+        "private_mib": round(values["Private_Clean"] + values["Private_Dirty"], 1),
+    }
+
+
+def process_tree(root):
+    """root and all its descendants, parents first"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                #the command name may contain spaces; the parent PID comes after its closing ")"
+                ppid = int(f.read().rpartition(")")[2].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop(0)
+        tree.append(pid)
+        stack += sorted(children.get(pid, []))
+    return tree
+
+
+def snapshot(root):
+    processes = []
+    for pid in process_tree(root):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmd = f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+            processes.append({"pid": pid, "role": "parent" if pid == root else "worker",
+                              "cmd": cmd[:120], **read_memory(pid)})
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    workers = [p for p in processes if p["role"] == "worker"] or processes
+    return {
+        "processes": processes,
+        "total_pss_mib": round(sum(p["pss_mib"] for p in processes), 1),
+        "total_rss_mib": round(sum(p["rss_mib"] for p in processes), 1),
+        "worker_rss_mib": round(sum(p["rss_mib"] for p in workers) / len(workers), 1),
+        "worker_pss_mib": round(sum(p["pss_mib"] for p in workers) / len(workers), 1),
+        "worker_private_mib": round(sum(p["private_mib"] for p in workers) / len(workers), 1),
+    }
+
+
+def print_snapshot(label, snap):
+    print(f"  {label}: total PSS {snap['total_pss_mib']:.1f} MiB (RSS sum {snap['total_rss_mib']:.1f}); "
+          f"per worker RSS {snap['worker_rss_mib']:.1f}, PSS {snap['worker_pss_mib']:.1f}, "
+          f"private {snap['worker_private_mib']:.1f} MiB")
+    for p in snap["processes"]:
+        print(f"    {p['role']:<7} {p['pid']:>7}  rss {p['rss_mib']:>8.1f}  pss {p['pss_mib']:>8.1f}  "
+              f"shared {p['shared_mib']:>8.1f}  private {p['private_mib']:>8.1f}")
+
+
+def measure(pid, url, payloads, args):
+    time.sleep(args.settle)
+    idle = snapshot(pid)
+    print_snapshot("idle", idle)
+    level = asyncio.run(run_level(url, payloads, args.workers, args.requests, args.timeout))
+    loaded = snapshot(pid)
+    print_snapshot(f"after {args.requests} requests", loaded)
+    return {"idle": idle, "loaded": loaded, "load": level}
+
+
+def commands(workers):
+    return {
+        "serve": lambda port: [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port),
+                               "--log-level", "warning"],
+        "uvicorn": lambda port: [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(workers),
+                                 "--port", str(port), "--log-level", "warning"],
+    }
+
+
+def main():
+    parser = common.add_common_args(argparse.ArgumentParser(description=__doc__.splitlines()[0]))
+    parser.set_defaults(sizes="50,200,1000")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--server", choices=("both", "serve", "uvicorn"), default="both")
+    parser.add_argument("--pid", type=int, help="measure this running server's process tree instead")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="with --pid: the server's address")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--settle", type=float, default=10.0,
+                        help="seconds to wait after the first ready answer, for slower workers")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    args = parser.parse_args()
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("Needs Linux /proc/<pid>/smaps_rollup")
+
+    from synthetic import cases
+    payloads = [{"transcript": text, "use_cache": False}
+                for _, _, _, text in cases(common.parse_list(args.sizes, int),
+                                           common.parse_list(args.profiles), args.seed)]
+
+    results = {"workers": args.workers}
+    if args.pid:
+        print(f"pid {args.pid} ({args.url})")
+        results["running"] = measure(args.pid, args.url, payloads, args)
+    else:
+        names = ("serve", "uvicorn") if args.server == "both" else (args.server,)
+        for name in names:
+            print(f"{name} --workers {args.workers}")
+            proc, url, _ = spawn_server(args, commands(args.workers)[name])
+            try:
+                results[name] = measure(proc.pid, url, payloads, args)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=60)
+    print(f"Wrote {common.write_results('memory', results, args)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Per-scorer microbenchmarks.
+
+    python benchmarks/bench_scorers.py --lt-stub [--sizes 50,1000] [--repeats 20]
+
+Parses each synthetic transcript once, then times document parsing and every
+TranscriptAnalyzer._score_* method on its own. The grammar scorer bypasses the
+sentence cache, so every sample is a LanguageTool call. Writes
+results/scorers-<commit>.json.
+"""
+import time
+import argparse
+import common
+
+
+def scorer_calls(analyzer, doc, plan):
+    """(name, zero-argument callable) for every _score_* method"""
+    calls = []
+    for name in sorted(dir(analyzer)):
+        if not name.startswith("_score_"):
+            continue
+        method = getattr(analyzer, name)
+        if name == "_score_speech_rate":
+            duration = analyzer._default_duration(doc.word_count, plan)
+            wpm = doc.word_count / duration * 60
+            calls.append((name, lambda m=method: m(wpm, duration, plan)))
+        elif name == "_score_grammar_languagetool":
+            #skip the sentence cache, or every sample after the warm-up is a cache lookup
+            calls.append((name, lambda m=method: m(doc, plan, use_cache=False)))
+        else:
+            calls.append((name, lambda m=method: m(doc, plan)))
+    return calls
+
+
+def time_call(fn, repeats):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = common.add_common_args(argparse.ArgumentParser(description=__doc__.splitlines()[0]))
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    if args.lt_stub:
+        common.use_lt_stub(args.lt_delay)
+
+    from analyzer import TranscriptAnalyzer
+    from synthetic import cases
+    analyzer = TranscriptAnalyzer(parallel=False)
+    plan = analyzer._with_topic_index(analyzer.plan, analyzer.model)
+
+    results = []
+    for label, words, profile, text in cases(common.parse_list(args.sizes, int),
+                                             common.parse_list(args.profiles), args.seed):
+        doc = analyzer._parse(text, plan)
+        row = {"case": label, "words": words, "profile": profile, "word_count": doc.word_count,
+               "stages": {"parse": common.summarize(time_call(lambda: analyzer._parse(text, plan), args.repeats))}}
+        for name, fn in scorer_calls(analyzer, doc, plan):
+            row["stages"][name] = common.summarize(time_call(fn, args.repeats))
+        results.append(row)
+        print(f"{label:>20}  " + "  ".join(f"{k.replace('_score_', '')}={v['p50']:.2f}ms"
+                                          for k, v in row["stages"].items()))
+
+    print(f"Wrote {common.write_results('scorers', results, args)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Response size and encode time: the default JSON against the compact formats.
+
+    python benchmarks/bench_serialization.py --lt-stub [--batch 100] [--repeats 200]
+
+Scores the synthetic transcripts once, then encodes the results every way the
+API can send them. One result is encoded as an /analyze response, and --batch
+results of different transcripts together as an /analyze/batch response.
+"json" is FastAPI's own path for a response_model (Pydantic validation, then
+dump_json). "json-jsonable" is the older jsonable_encoder + json.dumps path. The compact
+formats drop feedback, details and summary (see formats.py). msgpack, arrow and
+parquet are skipped when their packages are not installed. Each format is also
+gzipped at ANALYZER_GZIP_LEVEL, timed separately, as GZipMiddleware would send it.
+Writes results/serialization-<commit>.json.
+"""
+import gzip
+import json
+import time
+import argparse
+import common
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        body = fn()
+        samples.append(time.perf_counter() - t0)
+    return body, common.summarize(samples)
+
+
+def measure(encoders, repeats, level):
+    rows = {}
+    for name, fn in encoders.items():
+        body, encode = timed(fn, repeats)
+        compressed, compress = timed(lambda: gzip.compress(body, compresslevel=level), repeats)
+        rows[name] = {"bytes": len(body), "gzip_bytes": len(compressed),
+                      "encode_ms": encode, "gzip_ms": compress}
+    return rows
+
+
+def print_rows(label, rows):
+    base = rows["json"]
+    print(f"{label}")
+    print(f"  {'format':<16}{'bytes':>10}{'gzip':>10}{'size':>8}{'encode p50 ms':>15}{'+gzip ms':>10}{'speedup':>9}")
+    for name, row in rows.items():
+        print(f"  {name:<16}{row['bytes']:>10}{row['gzip_bytes']:>10}{row['bytes'] / base['bytes']:>8.2f}"
+              f"{row['encode_ms']['p50']:>15.4f}{row['gzip_ms']['p50']:>10.4f}"
+              f"{base['encode_ms']['p50'] / max(row['encode_ms']['p50'], 1e-9):>8.1f}x")
+
+
+def encoders(payload, model, items=None):
+    from pydantic import TypeAdapter
+    from fastapi.encoders import jsonable_encoder
+    import formats
+    adapter = TypeAdapter(model)
+    compact = (lambda: formats.compact_result(payload)) if items is None else \
+        (lambda: {"results": formats.compact_items(items)})
+    found = {
+        "json": lambda: adapter.dump_json(adapter.validate_python(payload)),
+        "json-jsonable": lambda: json.dumps(jsonable_encoder(adapter.validate_python(payload))).encode("utf-8"),
+        "compact-json": lambda: formats.encode(compact(), formats.COMPACT_JSON),
+    }
+    if formats.orjson is not None:
+        found["compact-stdlib"] = lambda: json.dumps(compact(), separators=(",", ":")).encode("utf-8")
+    if formats.msgpack is not None:
+        found["msgpack"] = lambda: formats.encode(compact(), formats.MSGPACK)
+    if items is not None and formats.HAS_ARROW:
+        found["arrow"] = lambda: formats.encode_table(items, formats.ARROW)
+        found["parquet"] = lambda: formats.encode_table(items, formats.PARQUET)
+    return found
+
+
+def main():
+    parser = common.add_common_args(argparse.ArgumentParser(description=__doc__.splitlines()[0]))
+    parser.set_defaults(sizes="50,200,1000")
+    parser.add_argument("--batch", type=int, default=100, help="results per batch response")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    if args.lt_stub:
+        common.use_lt_stub(args.lt_delay)
+
+    import config
+    from main import analyzer, AnalysisResult, BatchResult
+    from synthetic import cases
+    scored = [(label, analyzer.analyze(text, use_cache=False))
+              for label, _, _, text in cases(common.parse_list(args.sizes, int),
+                                             common.parse_list(args.profiles), args.seed)]
+
+    results = {"gzip_level": config.GZIP_LEVEL, "single": {}, "batch": {}}
+    for label, result in scored:
+        results["single"][label] = measure(encoders(result, AnalysisResult), args.repeats, config.GZIP_LEVEL)
+        print_rows(f"{label}: one result", results["single"][label])
+
+    #distinct transcripts (new seeds), so gzip does not get repeated results for free
+    texts, seed = [], args.seed
+    while len(texts) < args.batch:
+        texts += [text for _, _, _, text in cases(common.parse_list(args.sizes, int),
+                                                  common.parse_list(args.profiles), seed)]
+        seed += 1
+    items = analyzer.analyze_batch(texts[:args.batch], use_cache=False)
+    results["batch"] = measure(encoders({"results": items}, BatchResult, items),
+                               max(args.repeats // 10, 5), config.GZIP_LEVEL)
+    print_rows(f"batch of {args.batch}", results["batch"])
+    print(f"Wrote {common.write_results('serialization', results, args)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Shared setup for the benchmark scripts: paths, LanguageTool stub, stats and result files."""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def add_common_args(parser):
+    from synthetic import SIZES, PROFILES
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated transcript sizes in words")
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help=f"comma-separated density profiles ({', '.join(PROFILES)})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lt-stub", action="store_true",
+                        help="replace LanguageTool with the local stub server (no Java needed)")
+    parser.add_argument("--lt-delay", type=float, default=0.0, help="stub latency per check, in seconds")
+    parser.add_argument("--out", default="", help="result file (default: results/<name>-<commit>.json)")
+    return parser
+
+
+def parse_list(value, cast=str):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def use_lt_stub(delay=0.0):
+    """Start the LanguageTool stub and point the analyzer at it.
+
+    Must run before config is imported, since settings are read at import time.
+    """
+    import lt_stub_server
+    server, url = lt_stub_server.start(delay=delay)
+    os.environ["ANALYZER_LT_URLS"] = url
+    return server, url
+
+
+def summarize(seconds):
+    """Latency percentiles in milliseconds"""
+    ms = np.asarray(seconds, dtype=np.float64) * 1000
+    if not len(ms):
+        return {"n": 0}
+    return {
+        "n": int(len(ms)),
+        "mean": round(float(ms.mean()), 3),
+        "min": round(float(ms.min()), 3),
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p90": round(float(np.percentile(ms, 90)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def metadata(args=None):
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    return {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {k: v for k, v in sorted(os.environ.items()) if k.startswith("ANALYZER_")},
+        "args": vars(args) if args is not None else {},
+    }
+
+
+def write_results(name, results, args=None):
+    """Write {"meta", "results"} as JSON and return the path"""
+    meta = metadata(args)
+    path = getattr(args, "out", "") or os.path.join(RESULTS_DIR, f"{name}-{meta['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"benchmark": name, "meta": meta, "results": results}, f, indent=2)
+    return path
@@ -0,0 +1,114 @@
+"""Synthetic self-introduction transcripts of a given size and density.
+
+    from synthetic import generate
+    text = generate(2000, filler_rate=0.05, error_rate=0.01, topic_density=0.3, seed=1)
+
+The same arguments always give the same text, so benchmark runs are comparable
+across commits.
+"""
+import random
+
+GREETINGS = ["Hello everyone.", "Good morning everyone.", "Hi, I am excited to introduce myself."]
+CLOSINGS = ["Thank you for listening.", "That's all about me, thank you."]
+
+TOPIC_SENTENCES = {
+    "name": ["My name is {name}.", "Myself {name}.", "I'm {name} and I am happy to be here."],
+    "age": ["I am {age} years old.", "I turned {age} last year."],
+    "school": ["I study in class {grade} at {school}.", "My school is {school}."],
+    "family": ["I live with my parents and my {sibling}.", "My family is small and very kind."],
+    "hobbies": ["I enjoy playing {sport}.", "My hobby is {hobby}.", "I love to read books on weekends."],
+    "goals": ["My dream is to become a {job}.", "My goal is to study abroad."],
+    "unique": ["A fun fact about me is that I can {trick}.", "Something special about me is my memory."],
+    "achievements": ["My biggest achievement is winning a {contest}.", "I am good at solving puzzles."],
+}
+FILL = {
+    "name": ["Asha", "Rahul", "Muskan", "Dev", "Priya"],
+    "age": ["12", "13", "14", "15"],
+    "grade": ["7th", "8th", "9th"],
+    "school": ["Christ Public School", "Green Valley High", "St. Mary's Convent"],
+    "sibling": ["brother", "sister", "cousins"],
+    "sport": ["cricket", "football", "badminton"],
+    "hobby": ["painting", "dancing", "coding"],
+    "job": ["doctor", "scientist", "pilot"],
+    "trick": ["juggle", "whistle loudly", "solve a cube"],
+    "contest": ["quiz competition", "chess tournament", "science fair"],
+}
+
+FILLERS = ["um", "uh", "like", "you know", "basically", "actually", "i mean"]
+#matched by the basic grammar patterns, so error density is visible to both checkers
+ERRORS = ["i is", "he are", "they is", "we is"]
+
+SUBJECTS = ["The teacher", "My friend", "Our class", "The library", "The weekend", "The city", "Science"]
+VERBS = ["shows", "makes", "brings", "gives", "teaches", "helps", "changes"]
+OBJECTS = ["new ideas", "many lessons", "a lot of fun", "different stories", "useful skills",
+           "interesting questions", "good memories", "some challenges"]
+TAILS = ["every day", "at school", "in the evening", "during holidays", "with patience", "for everyone"]
+
+
+def _neutral(rng):
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(TAILS)}."
+
+
+def _topic(rng, topic):
+    template = rng.choice(TOPIC_SENTENCES[topic])
+    return template.format(**{k: rng.choice(v) for k, v in FILL.items()})
+
+
+def _sprinkle(rng, sentence, filler_rate, error_rate):
+    words = sentence.split(" ")
+    out = []
+    for word in words:
+        if rng.random() < filler_rate:
+            out.append(rng.choice(FILLERS) + ",")
+        if rng.random() < error_rate:
+            out.append(rng.choice(ERRORS))
+        out.append(word)
+    return " ".join(out)
+
+
+def generate(words, filler_rate=0.03, error_rate=0.005, topic_density=0.3, seed=0):
+    """A transcript of about `words` words.
+
+    filler_rate / error_rate: chance per word of inserting a filler word or a
+    grammar error before it. topic_density: share of sentences that mention a
+    rubric topic (each topic is mentioned at least once when there is room).
+    """
+    rng = random.Random(seed)
+    sentences = [rng.choice(GREETINGS)]
+    topics = list(TOPIC_SENTENCES)
+    rng.shuffle(topics)
+    pending = list(topics)
+    closing = rng.choice(CLOSINGS)
+    target = max(words - len(closing.split()), 0)
+    count = len(sentences[0].split())
+
+    while count < target:
+        if rng.random() < topic_density:
+            topic = pending.pop() if pending else rng.choice(topics)
+            sentence = _topic(rng, topic)
+        else:
+            sentence = _neutral(rng)
+        sentence = _sprinkle(rng, sentence, filler_rate, error_rate)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    sentences.append(closing)
+    return " ".join(sentences)
+
+
+#profile -> (filler_rate, error_rate, topic_density)
+PROFILES = {
+    "clean": (0.0, 0.0, 0.3),
+    "typical": (0.03, 0.005, 0.3),
+    "noisy": (0.12, 0.03, 0.15),
+    "topic-dense": (0.02, 0.005, 0.8),
+}
+SIZES = (50, 200, 1000, 3000, 10000)
+
+
+def cases(sizes=SIZES, profiles=None, seed=0):
+    """Yield (label, words, profile, text) for every size x profile combination"""
+    for profile in profiles or PROFILES:
+        filler_rate, error_rate, topic_density = PROFILES[profile]
+        for words in sizes:
+            text = generate(words, filler_rate, error_rate, topic_density, seed=seed + words)
+            yield f"{profile}-{words}", words, profile, text
@@ -0,0 +1,316 @@
+"""Score many transcripts offline with a pool of worker processes.
+
+    python bulk_score.py transcripts/ -o results.jsonl
+    python bulk_score.py "archive/2024/**/*.txt" -o results.csv --workers 8
+    python bulk_score.py manifest.jsonl -o results.jsonl      # {"id", "path" or "transcript", "duration_seconds"}
+    python bulk_score.py transcripts/ -o results.parquet      # a directory of Parquet files (needs pyarrow)
+
+Each worker loads the models once and scores chunks of transcripts with
+analyze_batch(), so embeddings are batched too. Results are appended to the
+output as chunks finish, and the IDs of finished transcripts are appended to a
+checkpoint file (<output>.done by default). Re-running the same command skips
+them, so an interrupted run picks up where it stopped. A transcript whose
+result was written just before a crash may appear twice in the output.
+Unreadable files, malformed manifest lines and entries without a transcript
+or path are written as records with an "error". So is every transcript of a
+chunk whose worker failed; those are not checkpointed and are retried on the
+next run.
+Set ANALYZER_LT_URLS so workers share one LanguageTool server instead of
+starting their own.
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from formats import CRITERIA
+
+CSV_COLUMNS = (["id", "overall_score", "word_count", "sentence_count"]
+               + [f"{name}_score" for name in CRITERIA] + ["grammar_method", "error"])
+
+
+def iter_items(source):
+    """Yield {"id", "path"/"transcript", "duration_seconds"} without reading transcript files"""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(".txt"):
+                    path = os.path.join(root, name)
+                    yield {"id": os.path.relpath(path, source), "path": path, "duration_seconds": None}
+    elif source.endswith(".jsonl") and os.path.isfile(source):
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    if not isinstance(entry, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    #reported as a failed record rather than ending the run
+                    yield {"id": str(line_no), "duration_seconds": None,
+                           "error": f"Invalid manifest line {line_no}: {e}"}
+                    continue
+                path = entry.get("path")
+                if path and not os.path.isabs(path):
+                    path = os.path.join(base, path)
+                yield {
+                    "id": str(entry.get("id") or entry.get("path") or line_no),
+                    "path": path,
+                    "transcript": entry.get("transcript"),
+                    "duration_seconds": entry.get("duration_seconds"),
+                }
+    else:
+        for path in sorted(glob.iglob(source, recursive=True)):
+            if os.path.isfile(path):
+                yield {"id": path, "path": path, "duration_seconds": None}
+
+
+def iter_chunks(items, size, skip):
+    chunk = []
+    for item in items:
+        if item["id"] in skip:
+            continue
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+#--- worker process ---
+
+_analyzer = None
+
+
+def _init_worker(use_cache):
+    global _analyzer
+    from analyzer import TranscriptAnalyzer
+    from result_cache import ResultCache
+    import config
+    cache = None
+    if use_cache and config.RESULT_CACHE_DB:
+        cache = ResultCache(config.RESULT_CACHE_SIZE, config.RESULT_CACHE_DB, config.RESULT_CACHE_DB_MAX_ROWS)
+    _analyzer = TranscriptAnalyzer(cache=cache)
+
+
+def _score_chunk(chunk):
+    records, batch, positions = [], [], []
+    for item in chunk:
+        record = {"id": item["id"], "duration_seconds": item.get("duration_seconds"), "result": None, "error": None}
+        records.append(record)
+        if item.get("error"):
+            record["error"] = item["error"]
+            continue
+        if item.get("transcript") is None and not item.get("path"):
+            record["error"] = "missing transcript/path"
+            continue
+        try:
+            text = item.get("transcript")
+            if text is None:
+                with open(item["path"], encoding="utf-8") as f:
+                    text = f.read()
+            if len(text.strip()) < 10:
+                record["error"] = "Transcript too short (minimum 10 characters)"
+                continue
+        except (OSError, UnicodeDecodeError) as e:
+            record["error"] = f"Read error: {e}"
+            continue
+        batch.append((text, item.get("duration_seconds")))
+        positions.append(len(records) - 1)
+
+    if batch:
+        for pos, outcome in zip(positions, _analyzer.analyze_batch(batch)):
+            records[pos]["result"] = outcome["result"]
+            records[pos]["error"] = outcome["error"]
+    return records
+
+
+#--- output ---
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(JsonlWriter):
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        if new:
+            self.writer.writerow(CSV_COLUMNS)
+
+    def write(self, record):
+        result = record["result"] or {}
+        criteria = result.get("criteria_scores", [])
+        scores = [c["score"] for c in criteria] if len(criteria) == len(CRITERIA) else [""] * len(CRITERIA)
+        method = criteria[CRITERIA.index("grammar")]["details"].get("method", "languagetool") if len(criteria) == len(CRITERIA) else ""
+        self.writer.writerow([record["id"], result.get("overall_score", ""), result.get("word_count", ""),
+                              result.get("sentence_count", "")] + scores + [method, record["error"] or ""])
+
+
+class ParquetWriter:
+    """A directory of Parquet files, one per flush, so every checkpointed result is in a complete file.
+
+    Read it back as one table with pyarrow.parquet.read_table(path). Larger
+    --chunk-size values mean fewer, larger files.
+    """
+
+    def __init__(self, path):
+        #fail before scoring anything when pyarrow is missing
+        import pyarrow.parquet  # noqa: F401
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+    def flush(self):
+        if not self.records:
+            return
+        import pyarrow.parquet as pq
+        from formats import to_table
+        table = to_table(self.records, keys=(("id", "string"), ("duration_seconds", "int32")))
+        name = f"part-{time.time_ns()}-{os.getpid()}.parquet"
+        #readers skip dot files, so a half-written part is never picked up
+        tmp = os.path.join(self.path, f".{name}.tmp")
+        with open(tmp, "wb") as f:
+            pq.write_table(table, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, name))
+        self.records = []
+
+    def close(self):
+        self.flush()
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+class Progress:
+    """Throughput and ETA on stderr, at most once per interval"""
+
+    def __init__(self, total, interval=2.0):
+        self.total = total
+        self.done = self.failed = 0
+        self.start = self.last = time.monotonic()
+        self.interval = interval
+
+    def update(self, done, failed, force=False):
+        self.done += done
+        self.failed += failed
+        now = time.monotonic()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        remaining = self.total - self.done
+        eta = time.strftime("%H:%M:%S", time.gmtime(remaining / rate)) if rate else "--:--:--"
+        pct = self.done / self.total * 100 if self.total else 100.0
+        sys.stderr.write(f"\r{self.done}/{self.total} ({pct:.1f}%)  {rate:.1f}/s  "
+                         f"failed {self.failed}  ETA {eta}   ")
+        sys.stderr.flush()
+
+
+def run(args):
+    checkpoint = args.checkpoint or f"{args.output}.done"
+    done = load_checkpoint(checkpoint)
+    total = sum(1 for item in iter_items(args.source) if item["id"] not in done)
+    if done:
+        print(f"Resuming: {len(done)} already scored, {total} to go", file=sys.stderr)
+    if not total:
+        print("Nothing to score.", file=sys.stderr)
+        return 0
+
+    fmt = args.format or {".csv": "csv", ".parquet": "parquet"}.get(os.path.splitext(args.output)[1], "jsonl")
+    writer = {"csv": CsvWriter, "parquet": ParquetWriter}.get(fmt, JsonlWriter)(args.output)
+    progress = Progress(total)
+    chunks = iter_chunks(iter_items(args.source), args.chunk_size, done)
+    max_pending = args.workers * 2
+
+    with open(checkpoint, "a", encoding="utf-8") as ckpt, \
+            ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                initargs=(not args.no_cache,)) as pool:
+        pending = {}
+        try:
+            for chunk in chunks:
+                pending[pool.submit(_score_chunk, chunk)] = chunk
+                #bounded in-flight work keeps memory flat however long the input is
+                if len(pending) >= max_pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    _drain({future: pending.pop(future) for future in finished}, writer, ckpt, progress)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                _drain({future: pending.pop(future) for future in finished}, writer, ckpt, progress)
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            print("\nInterrupted; re-run the same command to resume.", file=sys.stderr)
+            return 130
+        finally:
+            writer.close()
+    progress.update(0, 0, force=True)
+    print(f"\nScored {progress.done} transcripts ({progress.failed} failed) -> {args.output}", file=sys.stderr)
+    return 0
+
+
+def _drain(finished, writer, ckpt, progress):
+    """Write the records of finished {future: chunk}; a chunk that raised becomes error records"""
+    for future, chunk in finished.items():
+        try:
+            records, checkpointed = future.result(), True
+        except Exception as e:
+            #not checkpointed, so the next run retries these transcripts
+            records = [{"id": item["id"], "duration_seconds": item.get("duration_seconds"), "result": None,
+                        "error": f"Chunk failed: {e}"} for item in chunk]
+            checkpointed = False
+        for record in records:
+            writer.write(record)
+        #results reach disk before their IDs are checkpointed
+        writer.flush()
+        if checkpointed:
+            ckpt.write("".join(f"{record['id']}\n" for record in records))
+            ckpt.flush()
+        progress.update(len(records), sum(record["error"] is not None for record in records))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score transcripts in bulk")
+    parser.add_argument("source", help="directory of .txt files, a glob, or a .jsonl manifest")
+    parser.add_argument("-o", "--output", required=True,
+                        help="results file (.jsonl or .csv), or a directory for .parquet")
+    parser.add_argument("--format", choices=("jsonl", "csv", "parquet"), help="default: from the output extension")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=32, help="transcripts per worker task")
+    parser.add_argument("--checkpoint", default="", help="completed-ID file (default: <output>.done)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore ANALYZER_RESULT_CACHE_DB even when it is set")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
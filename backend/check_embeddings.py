@@ -0,0 +1,183 @@
+"""Compare an embedding backend against the reference on topic-similarity decisions.
+
+    python check_embeddings.py [--candidate onnx] [--dir transcripts/] [--min-agreement 0.98]
+
+Each backend is loaded in its own subprocess, so the reported RSS and latency
+are not mixed up. Every transcript (and, with --sentences, every sentence) is
+scored against the rubric topics by both backends. The script reports how
+often the "similarity > semantic_threshold" decision agrees, the similarity
+drift, encode latency and resident memory, and exits with status 1 when
+agreement is below --min-agreement.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import config
+import rubric
+from scoring_plan import compile_plan
+from topic_index import TopicIndex
+
+#short introductions that mention topics without the rubric's exact keywords
+BUILTIN_CORPUS = [
+    "Good morning. I turned thirteen last month and I study in grade eight at Green Valley High.",
+    "Hi, I'm Arjun. At home it's me, my mom, my dad and my little sister.",
+    "In my free time I paint landscapes and go cycling with friends.",
+    "Hello everyone, people call me Riya and I am in seventh standard.",
+    "My favourite subject is mathematics and I want to become an engineer.",
+    "I was born in 2011, so I'm fourteen now.",
+    "Every weekend I practise the guitar and sometimes I cook with my grandmother.",
+    "We are a family of five living in Pune.",
+    "I am a student of St. Mary's Convent, class 9.",
+    "Thank you for listening to my introduction.",
+    "Football is what I do after school every day.",
+    "My elder brother helps me with my homework.",
+]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    #ru_maxrss is a peak, in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(kind, texts_path, out_path, repeats):
+    """Subprocess side: load one backend, score the texts, write similarities and stats"""
+    from embeddings import load_backend
+    with open(texts_path) as f:
+        texts = json.load(f)
+    plan = compile_plan(rubric.RUBRIC, None, config.MODEL_NAME, paraphrases=config.TOPIC_PARAPHRASES)
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    backend = load_backend(kind, config.MODEL_NAME, config.ONNX_MODEL_DIR, config.ONNX_THREADS, config.CACHE_DIR)
+    load_seconds = time.perf_counter() - start
+    index = TopicIndex.load_or_build(backend, plan.topic_queries, backend.name, plan.version)
+
+    backend.encode(texts[:8], normalize_embeddings=True)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings = backend.encode(texts, batch_size=32, normalize_embeddings=True)
+        timings.append(time.perf_counter() - start)
+    single = []
+    for text in texts[:50]:
+        start = time.perf_counter()
+        backend.encode(text, normalize_embeddings=True)
+        single.append(time.perf_counter() - start)
+
+    sims = np.array([[index.similarities(e)[t] for t in index.topics] for e in embeddings], dtype=np.float32)
+    np.save(out_path, sims)
+    return {
+        "backend": backend.name,
+        "load_seconds": round(load_seconds, 2),
+        "rss_mb_after_load": round(rss_mb(), 1),
+        "rss_mb_model": round(rss_mb() - rss_before, 1),
+        "batch_encode_ms_per_text": round(min(timings) / len(texts) * 1000, 3),
+        "single_encode_ms_p50": round(float(np.median(single)) * 1000, 3),
+        "topics": index.topics,
+        "threshold": plan.semantic_threshold,
+    }
+
+
+def run_measure(kind, texts_path, repeats):
+    with tempfile.NamedTemporaryFile(suffix=f"-{kind}.npy", delete=False) as f:
+        out_path = f.name
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", kind,
+         "--texts", texts_path, "--out", out_path, "--repeats", str(repeats)],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{kind} backend failed:\n{proc.stderr.strip()}")
+    stats = json.loads(proc.stdout.strip().splitlines()[-1])
+    sims = np.load(out_path)
+    os.remove(out_path)
+    return stats, sims
+
+
+def load_texts(directory, sentences):
+    if directory:
+        texts = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+            with open(path, encoding="utf-8") as f:
+                texts.append(f.read().strip())
+    else:
+        texts = list(BUILTIN_CORPUS)
+    if sentences:
+        from nltk.tokenize import sent_tokenize
+        texts += [s for t in texts for s in sent_tokenize(t) if s not in texts]
+    return [t for t in texts if t]
+
+
+def compare(reference, candidate, texts_path, repeats, texts):
+    ref_stats, ref = run_measure(reference, texts_path, repeats)
+    cand_stats, cand = run_measure(candidate, texts_path, repeats)
+    threshold = ref_stats["threshold"]
+    topics = ref_stats["topics"]
+
+    ref_yes, cand_yes = ref > threshold, cand > threshold
+    flips = np.argwhere(ref_yes != cand_yes)
+    diff = np.abs(ref - cand)
+    return {
+        "texts": len(texts),
+        "decisions": int(ref.size),
+        "agreement": round(float((ref_yes == cand_yes).mean()), 4),
+        "flips": [{"text": texts[i][:80], "topic": topics[t],
+                   "reference": round(float(ref[i, t]), 3), "candidate": round(float(cand[i, t]), 3)}
+                  for i, t in flips],
+        "similarity_abs_diff": {"mean": round(float(diff.mean()), 4), "max": round(float(diff.max()), 4)},
+        "threshold": threshold,
+        "reference": {k: v for k, v in ref_stats.items() if k not in ("topics", "threshold")},
+        "candidate": {k: v for k, v in cand_stats.items() if k not in ("topics", "threshold")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check an embedding backend against the reference")
+    parser.add_argument("--reference", default="sentence-transformers")
+    parser.add_argument("--candidate", default="onnx")
+    parser.add_argument("--dir", default="", help="directory of .txt transcripts (default: built-in corpus)")
+    parser.add_argument("--sentences", action="store_true", help="also compare every sentence on its own")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    parser.add_argument("--json", default="", help="also write the report to this file")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--texts", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.texts, args.out, args.repeats)))
+        return 0
+
+    texts = load_texts(args.dir, args.sentences)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(texts, f)
+    try:
+        report = compare(args.reference, args.candidate, f.name, args.repeats, texts)
+    finally:
+        os.remove(f.name)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump(report, out, indent=2)
+    return 0 if report["agreement"] >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+import os
+import json
+import math
+import random
+import bisect
+import base64
+import hashlib
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves from several processes are not serialized
+    fcntl = None
+
+OVERALL = "overall"
+
+
+class CohortLimit(Exception):
+    """Raised when a new cohort would exceed the configured number of cohorts"""
+
+
+def transcript_key(text):
+    """Identity of a transcript for deduplication: a hash of its words, ignoring whitespace"""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+class SeenFilter:
+    """Bloom filter of the transcript keys already counted in a cohort.
+
+    Fixed size whatever the cohort holds. A false positive (a new transcript
+    taken for a repeat, so left out of the sketches) stays rare while the
+    cohort has well under bits/16 transcripts. Merging is a bitwise OR, so
+    merging the same filter twice changes nothing.
+    """
+
+    HASHES = 4
+
+    def __init__(self, bits, data=None):
+        self.bits = bits
+        self.data = bytearray(data) if data is not None else bytearray(bits // 8)
+
+    def _positions(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        return [int.from_bytes(digest[i * 4:i * 4 + 4], "little") % self.bits for i in range(self.HASHES)]
+
+    def __contains__(self, key):
+        return all(self.data[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        for p in self._positions(key):
+            self.data[p >> 3] |= 1 << (p & 7)
+
+    def merge(self, other):
+        if other.bits == self.bits:
+            merged = int.from_bytes(self.data, "little") | int.from_bytes(other.data, "little")
+            self.data = bytearray(merged.to_bytes(len(self.data), "little"))
+        return self
+
+    def to_dict(self):
+        return {"bits": self.bits, "data": base64.b64encode(bytes(self.data)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["bits"], base64.b64decode(data["data"]))
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (Karnin, Lang and Liberty, 2016).
+
+    Values sit in levels of compactors; a value in level h stands for 2**h
+    inputs. When the sketch is full, the first level over its capacity is
+    sorted and every other value (starting at a random offset) moves up one
+    level, so the sketch never holds more than about 3k values however many
+    it has seen. Rank error is roughly 1.7/k of n.
+
+    Every level is kept sorted, so a rank is one bisect per level (about
+    log2(n/k) of them), a few microseconds with no rebuild after updates.
+    """
+
+    def __init__(self, k=200, c=2 / 3, rng=None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.levels = []
+        self._rng = rng or random
+        self._grow()
+
+    def _capacity(self, h):
+        return int(math.ceil(self.c ** (len(self.levels) - h - 1) * self.k)) + 1
+
+    def _grow(self):
+        self.levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _size(self):
+        return sum(len(level) for level in self.levels)
+
+    def update(self, value):
+        value = float(value)
+        bisect.insort(self.levels[0], value)
+        self.n += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self._size() >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        while self._size() >= self._max_size:
+            for h, level in enumerate(self.levels):
+                if len(level) >= self._capacity(h):
+                    if h + 1 == len(self.levels):
+                        self._grow()
+                    #an odd value out stays behind, so the total weight is always exactly n
+                    odd = len(level) % 2
+                    promoted = level[self._rng.randint(0, 1):len(level) - odd:2]
+                    self.levels[h] = level[len(level) - odd:]
+                    self.levels[h + 1] = sorted(self.levels[h + 1] + promoted)
+                    break
+
+    def merge(self, other):
+        """Fold another sketch into this one; the result is as accurate as if it had seen both streams"""
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for h, level in enumerate(other.levels):
+            if level:
+                self.levels[h] = sorted(self.levels[h] + level)
+        self.n += other.n
+        for bound, pick in (("min", min), ("max", max)):
+            values = [v for v in (getattr(self, bound), getattr(other, bound)) if v is not None]
+            setattr(self, bound, pick(values) if values else None)
+        self._compress()
+        return self
+
+    def weights(self, value):
+        """(inputs below value, inputs equal to value), estimated"""
+        below = equal = 0
+        for h, level in enumerate(self.levels):
+            lo = bisect.bisect_left(level, value)
+            hi = bisect.bisect_right(level, value, lo)
+            below += lo << h
+            equal += (hi - lo) << h
+        return below, equal
+
+    def rank(self, value):
+        """Fraction of inputs below value, counting ties as half; None when empty"""
+        if not self.n:
+            return None
+        below, equal = self.weights(value)
+        return (below + equal / 2) / self.n
+
+    def quantile(self, q):
+        """Smallest retained value with at least fraction q of the inputs at or below it"""
+        if not self.n:
+            return None
+        items = sorted((v, 1 << h) for h, level in enumerate(self.levels) for v in level)
+        target, seen = q * self.n, 0
+        for value, weight in items:
+            seen += weight
+            if seen >= target:
+                return value
+        return items[-1][0]
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "min": self.min, "max": self.max, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.levels = []
+        for level in data["levels"]:
+            sketch._grow()
+            sketch.levels[-1] = sorted(level)
+        return sketch
+
+
+class CohortStore:
+    """Per-cohort quantile sketches of the overall score and each criterion's score.
+
+    Each process keeps the sketches last read from the file (base) apart from
+    what it recorded since (delta). Ranks combine both. save() locks the file,
+    merges this process's delta into whatever is on disk (other workers save
+    theirs too), writes the result atomically and adopts it as the new base,
+    so workers forked by serve.py converge on one shared distribution.
+
+    With dedupe_bits set, each cohort also keeps a SeenFilter of the
+    transcripts it has counted, so a resubmitted transcript is ranked but not
+    recorded again. The filters are OR-merged with the file's on every save.
+    """
+
+    def __init__(self, path=None, k=200, max_cohorts=1000, dedupe_bits=65536):
+        self.path = path
+        self.k = k
+        self.max_cohorts = max_cohorts
+        self.dedupe_bits = dedupe_bits
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._base = {}
+        self._saving = {}  # a delta being merged into the file, still counted in ranks
+        self._delta = {}
+        self._seen = {}
+        self._mtime = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._interval = None
+        self.load()
+
+    def load(self):
+        """Replace the base sketches with the file's, if it changed since the last read"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns if self.path else None
+        except FileNotFoundError:
+            return
+        if mtime is None or mtime == self._mtime:
+            return
+        try:
+            base, seen = self._read()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Cohort file load error: {e}")
+            return
+        with self._lock:
+            self._base = base
+            self._merge_seen(seen)
+            self._mtime = mtime
+
+    def _read(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        sketches = {cohort: {metric: KLLSketch.from_dict(s) for metric, s in metrics.items()}
+                    for cohort, metrics in data.get("cohorts", {}).items()}
+        seen = {cohort: SeenFilter.from_dict(f) for cohort, f in data.get("seen", {}).items()}
+        return sketches, seen
+
+    def _merge_seen(self, seen):
+        #keeps this process's additions; the result is the union of both
+        for cohort, other in seen.items():
+            if cohort in self._seen:
+                self._seen[cohort].merge(other)
+            else:
+                self._seen[cohort] = SeenFilter(other.bits, other.data)
+
+    def _known(self):
+        return set(self._base) | set(self._saving) | set(self._delta)
+
+    def _sketches(self, cohort, metric):
+        for source in (self._base, self._saving, self._delta):
+            sketch = source.get(cohort, {}).get(metric)
+            if sketch is not None and sketch.n:
+                yield sketch
+
+    def rank_and_record(self, cohorts, result, key=None):
+        """Percentile ranks of result within each cohort, then add result to those cohorts.
+
+        Ranks are against the transcripts seen before this one, as percentages
+        (ties count half). Scores from degraded criteria are ranked but not
+        recorded, and neither is the overall score of a degraded result. A
+        result whose key (transcript_key) a cohort has already counted is
+        ranked only; "recorded" in its entry is then false.
+        """
+        scores = [(OVERALL, result["overall_score"], bool(result.get("degraded")))]
+        scores += [(c["metric"], c["score"], bool(c["details"].get("degraded")))
+                   for c in result["criteria_scores"]]
+        percentiles = {}
+        with self._lock:
+            new = [c for c in cohorts if c not in self._known()]
+            if new and len(self._known()) + len(new) > self.max_cohorts:
+                raise CohortLimit(f"Cohort limit reached ({self.max_cohorts}); cannot add {', '.join(new)}")
+            for cohort in cohorts:
+                ranks = {metric: self._rank(cohort, metric, score) for metric, score, _ in scores}
+                seen = sum(s.n for s in self._sketches(cohort, OVERALL))
+                record = True
+                if key is not None and self.dedupe_bits > 0:
+                    counted = self._seen.setdefault(cohort, SeenFilter(self.dedupe_bits))
+                    record = key not in counted
+                    counted.add(key)
+                delta = self._delta.setdefault(cohort, {})
+                for metric, score, degraded in scores:
+                    if record and not degraded:
+                        if metric not in delta:
+                            delta[metric] = KLLSketch(self.k)
+                        delta[metric].update(score)
+                percentiles[cohort] = {"n": seen, "overall": ranks.pop(OVERALL), "criteria": ranks,
+                                       "recorded": record}
+        return percentiles
+
+    def _rank(self, cohort, metric, score):
+        below = equal = n = 0
+        for sketch in self._sketches(cohort, metric):
+            b, e = sketch.weights(score)
+            below, equal, n = below + b, equal + e, n + sketch.n
+        if not n:
+            return None
+        return round(100 * (below + equal / 2) / n, 1)
+
+    def summary(self, cohort, quantiles=(0.1, 0.25, 0.5, 0.75, 0.9)):
+        """Count, range and quantiles of each metric in a cohort, or None if it is unknown"""
+        with self._lock:
+            if cohort not in self._known():
+                return None
+            merged = {}
+            for source in (self._base, self._saving, self._delta):
+                for metric, sketch in source.get(cohort, {}).items():
+                    merged.setdefault(metric, KLLSketch(self.k)).merge(sketch)
+        return {metric: {"n": sketch.n, "min": sketch.min, "max": sketch.max,
+                         "quantiles": {str(q): sketch.quantile(q) for q in quantiles}}
+                for metric, sketch in merged.items()}
+
+    def stats(self):
+        with self._lock:
+            cohorts = len(self._known())
+            unsaved = sum(s.n for source in (self._saving, self._delta)
+                          for metrics in source.values() for s in metrics.values())
+        return {"cohorts": cohorts, "max_cohorts": self.max_cohorts, "unsaved_values": unsaved,
+                "path": self.path}
+
+    def save(self):
+        """Merge this process's new values into the file and adopt the result; a no-op without a path"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                self._saving, self._delta = self._delta, {}
+            if not self._saving:
+                #nothing to add, but pick up what other workers saved
+                self.load()
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(f"{self.path}.lock", "a") as lock:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_EX)
+                    merged, seen = self._read() if os.path.exists(self.path) else ({}, {})
+                    for cohort, metrics in self._saving.items():
+                        target = merged.setdefault(cohort, {})
+                        for metric, sketch in metrics.items():
+                            target.setdefault(metric, KLLSketch(self.k)).merge(sketch)
+                    with self._lock:
+                        self._merge_seen(seen)
+                        seen = {cohort: f.to_dict() for cohort, f in self._seen.items()}
+                    data = {"cohorts": {cohort: {metric: s.to_dict() for metric, s in metrics.items()}
+                                        for cohort, metrics in merged.items()},
+                            "seen": seen}
+                    #write to a temp file first so a reader never sees a partial file
+                    tmp = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        json.dump(data, f, separators=(",", ":"))
+                    os.replace(tmp, self.path)
+                    mtime = os.stat(self.path).st_mtime_ns
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Cohort file save error: {e}")
+                #hand the values back for the next attempt
+                with self._lock:
+                    for cohort, metrics in self._saving.items():
+                        target = self._delta.setdefault(cohort, {})
+                        for metric, sketch in metrics.items():
+                            target[metric] = sketch.merge(target[metric]) if metric in target else sketch
+                    self._saving = {}
+                return
+            with self._lock:
+                self._base, self._saving, self._mtime = merged, {}, mtime
+
+    def start_autosave(self, interval):
+        """Save every interval seconds in a daemon thread"""
+        if not self.path or interval <= 0:
+            return
+        self._interval = interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._autosave, name="cohort-autosave", daemon=True)
+        self._thread.start()
+
+    def _autosave(self):
+        while not self._stop.wait(self._interval):
+            self.save()
+
+    def stop(self):
+        """Stop the autosave thread and save what is left"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.save()
+
+    def after_fork(self):
+        """New locks in a forked worker; values recorded in the parent stay with the parent"""
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._saving = {}
+        self._delta = {}
+        self._stop = threading.Event()
+        self._thread = None
@@ -0,0 +1,73 @@
+import time
+import threading
+
+
+class LazyComponent:
+    """A heavy resource that is loaded once, eagerly or in a background thread.
+
+    Tracks its load state (pending, loading, ready, failed) and load time so
+    readiness can be reported per component. get() blocks until the value is
+    available, loading it in the calling thread if nobody has started yet.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.state = "pending"
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def _claim(self):
+        with self._lock:
+            if self.state != "pending":
+                return False
+            self.state = "loading"
+            return True
+
+    def _run(self):
+        start = time.monotonic()
+        try:
+            self.value = self._loader()
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"Loading {self.name} failed: {e}")
+        finally:
+            self.load_seconds = round(time.monotonic() - start, 3)
+            self._done.set()
+
+    def start(self):
+        """Begin loading in a daemon thread; no-op if already started"""
+        if self._claim():
+            threading.Thread(target=self._run, name=f"load-{self.name}", daemon=True).start()
+        return self
+
+    def load(self):
+        """Load in the calling thread (or wait for the load already running)"""
+        if self._claim():
+            self._run()
+        return self.get()
+
+    def wait(self, timeout=None):
+        """Wait for a started load to finish, successfully or not"""
+        return self._done.wait(timeout)
+
+    def get(self, timeout=None):
+        if self.state == "pending":
+            return self.load()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} still loading")
+        if self.state == "failed":
+            raise RuntimeError(f"{self.name} failed to load: {self.error}")
+        return self.value
+
+    def status(self):
+        return {"state": self.state, "load_seconds": self.load_seconds, "error": self.error}
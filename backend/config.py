@@ -0,0 +1,105 @@
+import os
+
+#all settings can be overridden with environment variables
+
+MODEL_NAME = os.environ.get("ANALYZER_MODEL", "all-MiniLM-L6-v2")
+
+#embedding runtime: "sentence-transformers" (PyTorch reference) or "onnx" (int8 export from export_onnx.py)
+EMBEDDING_BACKEND = os.environ.get("ANALYZER_EMBEDDING_BACKEND", "sentence-transformers")
+#directory holding the ONNX export (default: <CACHE_DIR>/onnx/<model>) and onnxruntime threads (0 = all cores)
+ONNX_MODEL_DIR = os.environ.get("ANALYZER_ONNX_MODEL_DIR", "")
+ONNX_THREADS = int(os.environ.get("ANALYZER_ONNX_THREADS", "0"))
+
+#cross-request batching of embedding calls: texts per model call (0 or 1 disables) and how long
+#the first queued text waits for others to join its batch
+EMBEDDING_BATCH_MAX = int(os.environ.get("ANALYZER_EMBEDDING_BATCH_MAX", "32"))
+EMBEDDING_BATCH_WAIT_MS = float(os.environ.get("ANALYZER_EMBEDDING_BATCH_WAIT_MS", "5"))
+
+#directory for persisted artifacts (topic embeddings, caches)
+CACHE_DIR = os.environ.get("ANALYZER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+#score topics against several paraphrases instead of only "student's <topic>"
+TOPIC_PARAPHRASES = os.environ.get("ANALYZER_TOPIC_PARAPHRASES", "0") == "1"
+
+#in-memory result cache size (0 disables the cache), optional SQLite file for a persistent tier,
+#and the most results that file keeps (oldest writes are dropped first; 0 = unbounded)
+RESULT_CACHE_SIZE = int(os.environ.get("ANALYZER_RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_DB = os.environ.get("ANALYZER_RESULT_CACHE_DB", "")
+RESULT_CACHE_DB_MAX_ROWS = int(os.environ.get("ANALYZER_RESULT_CACHE_DB_MAX_ROWS", "100000"))
+
+#run independent scoring stages concurrently inside one analysis
+PARALLEL_STAGES = os.environ.get("ANALYZER_PARALLEL_STAGES", "1") == "1"
+STAGE_WORKERS = int(os.environ.get("ANALYZER_STAGE_WORKERS", "8"))
+#analyses running at once for the async API endpoints
+REQUEST_WORKERS = int(os.environ.get("ANALYZER_REQUEST_WORKERS", "4"))
+
+#LanguageTool backends: comma-separated server URLs, or N local servers when unset
+LT_URLS = [u.strip() for u in os.environ.get("ANALYZER_LT_URLS", "").split(",") if u.strip()]
+LT_POOL_SIZE = int(os.environ.get("ANALYZER_LT_POOL_SIZE", "1"))
+LT_MAX_QUEUE = int(os.environ.get("ANALYZER_LT_MAX_QUEUE", "32"))
+LT_TIMEOUT = float(os.environ.get("ANALYZER_LT_TIMEOUT", "10"))
+#when the queue is full: "fallback" to the basic grammar check or "reject" with 503
+LT_ON_SATURATION = os.environ.get("ANALYZER_LT_ON_SATURATION", "fallback")
+
+#per-sentence LanguageTool match cache (0 disables) and optional SQLite file for a persistent tier
+GRAMMAR_CACHE_SIZE = int(os.environ.get("ANALYZER_GRAMMAR_CACHE_SIZE", "20000"))
+GRAMMAR_CACHE_DB = os.environ.get("ANALYZER_GRAMMAR_CACHE_DB", "")
+
+#default latency budget per analysis in ms (0 = none); requests can override it with budget_ms.
+#stages with less than DEADLINE_MIN_STAGE_MS left skip straight to their cheap fallback
+BUDGET_MS = float(os.environ.get("ANALYZER_BUDGET_MS", "0"))
+DEADLINE_MIN_STAGE_MS = float(os.environ.get("ANALYZER_DEADLINE_MIN_STAGE_MS", "50"))
+
+#seconds between checks of rubric.py for changes (0 disables the watcher; POST /admin/rubric/reload still works)
+RUBRIC_WATCH_SECONDS = float(os.environ.get("ANALYZER_RUBRIC_WATCH_SECONDS", "0"))
+
+#load NLTK, the embedding model and LanguageTool in background threads after startup
+LAZY_LOAD = os.environ.get("ANALYZER_LAZY_LOAD", "0") == "1"
+
+#semantic keyword scoring per sentence instead of on the whole transcript (which the model
+#truncates): "on", "off", or "auto" to chunk only transcripts longer than SEMANTIC_CHUNK_MIN_WORDS.
+#Off by default: chunking changes Keyword Presence scores, and chunked transcripts are encoded
+#on their own rather than in /analyze/batch's shared model call
+SEMANTIC_CHUNKING = os.environ.get("ANALYZER_SEMANTIC_CHUNKING", "off")
+SEMANTIC_CHUNK_MIN_WORDS = int(os.environ.get("ANALYZER_SEMANTIC_CHUNK_MIN_WORDS", "200"))
+SEMANTIC_CHUNK_BATCH = int(os.environ.get("ANALYZER_SEMANTIC_CHUNK_BATCH", "32"))
+#a topic's score is the mean similarity of its best K sentences (1 = max)
+SEMANTIC_TOP_K = int(os.environ.get("ANALYZER_SEMANTIC_TOP_K", "1"))
+
+#background job API: SQLite queue file, worker threads per process (0 = only accept jobs, e.g. when a
+#separate process runs them), transcripts scored per batch, and limits
+JOB_DB = os.environ.get("ANALYZER_JOB_DB", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("ANALYZER_JOB_WORKERS", "2"))
+JOB_CHUNK_SIZE = int(os.environ.get("ANALYZER_JOB_CHUNK_SIZE", "16"))
+JOB_MAX_ITEMS = int(os.environ.get("ANALYZER_JOB_MAX_ITEMS", "10000"))
+#queued jobs beyond this are refused with 503 (0 = unlimited)
+JOB_MAX_QUEUED = int(os.environ.get("ANALYZER_JOB_MAX_QUEUED", "1000"))
+#a running job with no progress for this long is assumed orphaned and requeued
+JOB_STALE_SECONDS = float(os.environ.get("ANALYZER_JOB_STALE_SECONDS", "300"))
+#finished jobs and their results are deleted after this many hours (0 keeps them)
+JOB_RETENTION_HOURS = float(os.environ.get("ANALYZER_JOB_RETENTION_HOURS", "168"))
+
+#transcripts allowed in one /analyze/batch request
+MAX_BATCH_ITEMS = int(os.environ.get("ANALYZER_MAX_BATCH_ITEMS", "1000"))
+
+#uploads: largest transcript (decoded incrementally, rejected past the cap), and for zip archives
+#the largest upload, most files, and files scored at once while the archive is being read
+MAX_TRANSCRIPT_BYTES = int(os.environ.get("ANALYZER_MAX_TRANSCRIPT_BYTES", str(1024 * 1024)))
+ARCHIVE_MAX_BYTES = int(os.environ.get("ANALYZER_ARCHIVE_MAX_BYTES", str(200 * 1024 * 1024)))
+ARCHIVE_MAX_ENTRIES = int(os.environ.get("ANALYZER_ARCHIVE_MAX_ENTRIES", "2000"))
+ARCHIVE_CONCURRENCY = int(os.environ.get("ANALYZER_ARCHIVE_CONCURRENCY", "2"))
+
+#cohort percentiles: file the per-cohort quantile sketches are merged into, sketch size (rank error is
+#about 1.7/k), seconds between saves, most cohorts kept, and most cohorts one request can name
+COHORT_FILE = os.environ.get("ANALYZER_COHORT_FILE", os.path.join(CACHE_DIR, "cohorts.json"))
+COHORT_SKETCH_K = int(os.environ.get("ANALYZER_COHORT_SKETCH_K", "200"))
+COHORT_SAVE_SECONDS = float(os.environ.get("ANALYZER_COHORT_SAVE_SECONDS", "30"))
+COHORT_MAX = int(os.environ.get("ANALYZER_COHORT_MAX", "1000"))
+COHORT_MAX_PER_REQUEST = int(os.environ.get("ANALYZER_COHORT_MAX_PER_REQUEST", "8"))
+#bits per cohort in the filter of transcripts already counted, so resubmissions are ranked but not
+#recorded twice (0 counts every submission); keep cohorts well under bits/16 transcripts
+COHORT_DEDUPE_BITS = int(os.environ.get("ANALYZER_COHORT_DEDUPE_BITS", "65536"))
+
+#gzip responses of at least GZIP_MIN_BYTES for clients sending Accept-Encoding: gzip (0 disables), at this zlib level
+GZIP_MIN_BYTES = int(os.environ.get("ANALYZER_GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("ANALYZER_GZIP_LEVEL", "5"))
@@ -0,0 +1,37 @@
+import time
+
+
+class Deadline:
+    """A latency budget that started counting when the request arrived.
+
+    Stages ask remaining() before starting expensive work and use it as their
+    timeout, so one slow dependency cannot push a request past its budget.
+    """
+
+    __slots__ = ("budget", "start", "end")
+
+    def __init__(self, budget_seconds):
+        self.budget = budget_seconds
+        self.start = time.monotonic()
+        self.end = self.start + budget_seconds
+
+    @classmethod
+    def from_ms(cls, budget_ms):
+        """None when there is no budget (None or <= 0)"""
+        if not budget_ms or budget_ms <= 0:
+            return None
+        return cls(budget_ms / 1000)
+
+    def remaining(self):
+        return max(self.end - time.monotonic(), 0.0)
+
+    def allows(self, seconds):
+        """True if at least `seconds` are left"""
+        return self.remaining() >= seconds
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.end
+
+    def elapsed_ms(self):
+        return round((time.monotonic() - self.start) * 1000, 3)
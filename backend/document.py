@@ -0,0 +1,53 @@
+from collections import Counter
+from nltk.tokenize import word_tokenize, sent_tokenize
+
+
+class ParsedDocument:
+    """A transcript parsed once and shared by every scorer.
+
+    Holds the lowered text, sentence list with (start, end) character spans,
+    lowercase tokens, a token frequency table and the derived counts. When a
+    PhraseMatcher is given, its hits are stored by group in `hits`.
+    """
+
+    __slots__ = ("text", "lower", "sentences", "sentence_spans", "tokens",
+                 "token_freq", "word_count", "alpha_count", "alpha_unique", "hits")
+
+    def __init__(self, text: str, matcher=None):
+        self.text = text
+        self.lower = text.lower()
+        self.hits = matcher.group_hits(self.lower) if matcher is not None else {}
+        self.sentences = sent_tokenize(text)
+        self.sentence_spans = self._spans(text, self.sentences)
+        self.tokens = word_tokenize(self.lower)
+        self.token_freq = Counter(self.tokens)
+
+        #counts are taken over distinct tokens, not the full token list
+        word_count = alpha_count = alpha_unique = 0
+        for token, n in self.token_freq.items():
+            if token.isalnum():
+                word_count += n
+            if token.isalpha():
+                alpha_count += n
+                alpha_unique += 1
+        self.word_count = word_count
+        self.alpha_count = alpha_count
+        self.alpha_unique = alpha_unique
+
+    @staticmethod
+    def _spans(text, sentences):
+        #sent_tokenize returns verbatim slices, so each sentence is found after the previous one
+        spans = []
+        pos = 0
+        for sent in sentences:
+            start = text.find(sent, pos)
+            if start < 0:
+                start = pos
+            end = start + len(sent)
+            spans.append((start, end))
+            pos = end
+        return spans
+
+    @property
+    def sentence_count(self):
+        return len(self.sentences)
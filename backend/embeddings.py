@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import queue
+import threading
+import numpy as np
+from metrics import EMBEDDING_BATCH_SIZE
+
+#ANALYZER_EMBEDDING_BACKEND values
+BACKENDS = ("sentence-transformers", "onnx")
+
+
+class EmbeddingBackend:
+    """Turns text into sentence embeddings.
+
+    encode() mirrors SentenceTransformer.encode for the arguments the analyzer
+    uses: a string gives one vector, a list gives a (n x dim) float32 array.
+    `name` identifies the model and runtime, and keys every cache built from
+    the embeddings, so switching backends never reuses another backend's vectors.
+    """
+
+    name = None
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, **kwargs):
+        raise NotImplementedError
+
+    def after_fork(self, threads=0):
+        """Rebuild runtime state a forked worker can't inherit; threads caps intra-op threads (0 = default)"""
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Reference backend: the PyTorch sentence-transformers model"""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, **kwargs):
+        return self.model.encode(texts, batch_size=batch_size,
+                                 normalize_embeddings=normalize_embeddings, **kwargs)
+
+    def after_fork(self, threads=0):
+        #the weights stay shared with the parent; only the thread count is per process
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
+
+class OnnxBackend(EmbeddingBackend):
+    """int8-quantized ONNX export of the same model, run with onnxruntime.
+
+    Needs only onnxruntime and tokenizers (no PyTorch). model_dir is what
+    export_onnx.py writes: model_quantized.onnx, tokenizer.json and
+    embedding_config.json. Pooling matches sentence-transformers: mean over
+    non-padding tokens, optionally L2-normalized.
+    """
+
+    def __init__(self, model_dir, model_name, threads=0):
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, "embedding_config.json")) as f:
+            settings = json.load(f)
+        self.name = f"{model_name}-onnx-int8"
+        self.max_seq_length = settings["max_seq_length"]
+        self.model_path = os.path.join(model_dir, "model_quantized.onnx")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=settings.get("pad_id", 0), pad_token=settings.get("pad_token", "[PAD]"))
+
+        self.session = self._session(threads)
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _session(self, threads):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+
+    def after_fork(self, threads=0):
+        #an onnxruntime session's thread pool does not survive fork(); the int8 model is small to reload
+        self.session = self._session(threads)
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        out = np.empty((len(texts), 0), dtype=np.float32)
+        #similar lengths share a batch so little time is spent on padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            vectors = self._forward([texts[i] for i in idx])
+            if not out.shape[1]:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[idx] = vectors
+        if normalize_embeddings and len(out):
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+    def _forward(self, batch):
+        encodings = self.tokenizer.encode_batch(batch)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feed)[0]
+        weights = mask[:, :, None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+
+
+class _Pending:
+    __slots__ = ("texts", "vectors", "error", "done")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingBatcher(EmbeddingBackend):
+    """Coalesces small encode() calls from concurrent requests into one model call.
+
+    Callers queue their texts and wait. A single consumer thread takes the
+    first queued call, then collects more until max_batch texts are queued or
+    max_wait seconds have passed, whichever comes first. It runs one encode on
+    the wrapped backend and hands each caller its rows. Calls that already
+    bring max_batch texts or more skip the queue and go straight to the backend.
+    """
+
+    def __init__(self, backend, max_batch=32, max_wait=0.005):
+        self.backend = backend
+        self.name = backend.name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._start()
+
+    def _start(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.largest = 0
+        self.direct = 0
+        threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        if not items or len(items) >= self.max_batch or kwargs:
+            with self._lock:
+                self.direct += 1
+            return self.backend.encode(texts, batch_size=batch_size,
+                                       normalize_embeddings=normalize_embeddings, **kwargs)
+        pending = _Pending(items)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        out = pending.vectors
+        if normalize_embeddings:
+            out = out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            count = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch:
+                try:
+                    pending = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                count += len(pending.texts)
+            self._encode(batch, count)
+
+    def _encode(self, batch, count):
+        try:
+            #callers normalize their own rows, so one call serves both kinds of request
+            vectors = np.asarray(self.backend.encode([t for p in batch for t in p.texts], batch_size=count,
+                                                     normalize_embeddings=False), dtype=np.float32)
+            start = 0
+            for pending in batch:
+                pending.vectors = vectors[start:start + len(pending.texts)]
+                start += len(pending.texts)
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+        EMBEDDING_BATCH_SIZE.observe(count)
+        with self._lock:
+            self.batches += 1
+            self.texts += count
+            self.largest = max(self.largest, count)
+
+    def after_fork(self, threads=0):
+        #the consumer thread stays behind in the parent
+        self.backend.after_fork(threads)
+        self._start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "batches": self.batches,
+                "texts": self.texts,
+                "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest,
+                "direct_calls": self.direct,
+                "queued": self._queue.qsize(),
+            }
+
+
+def backend_id(kind, model_name):
+    """The name a backend of this kind will have, known before it is loaded"""
+    return f"{model_name}-onnx-int8" if kind == "onnx" else model_name
+
+
+def default_onnx_dir(cache_dir, model_name):
+    return os.path.join(cache_dir, "onnx", model_name.replace("/", "_"))
+
+
+def load_backend(kind, model_name, onnx_dir=None, threads=0, cache_dir=""):
+    if kind == "sentence-transformers":
+        return SentenceTransformerBackend(model_name)
+    if kind == "onnx":
+        model_dir = onnx_dir or default_onnx_dir(cache_dir, model_name)
+        if not os.path.exists(os.path.join(model_dir, "model_quantized.onnx")):
+            raise FileNotFoundError(f"No ONNX export in {model_dir}; run: python export_onnx.py")
+        return OnnxBackend(model_dir, model_name, threads)
+    raise ValueError(f"Unknown embedding backend {kind!r} (expected one of {', '.join(BACKENDS)})")
@@ -0,0 +1,70 @@
+"""Export the sentence-transformers model to ONNX and quantize it to int8.
+
+    python export_onnx.py [--model all-MiniLM-L6-v2] [--out DIR]
+
+Writes model.onnx, model_quantized.onnx, tokenizer.json and
+embedding_config.json to DIR (default: <ANALYZER_CACHE_DIR>/onnx/<model>),
+which is where ANALYZER_EMBEDDING_BACKEND=onnx looks for them. Needs the
+full PyTorch stack plus onnx and onnxruntime; serving the export afterwards
+needs only onnxruntime and tokenizers.
+"""
+import os
+import json
+import argparse
+import config
+from embeddings import default_onnx_dir
+
+
+def export(model_name, out_dir, opset=14):
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0]
+    hf_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    os.makedirs(out_dir, exist_ok=True)
+
+    sample = tokenizer(["a short example sentence"], return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    class Encoder(torch.nn.Module):
+        #only the token embeddings are exported; pooling is done in numpy by OnnxBackend
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            return self.model(**dict(zip(names, args))).last_hidden_state
+
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(Encoder(hf_model), tuple(sample[n] for n in names), fp32_path,
+                          input_names=names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic, opset_version=opset, do_constant_folding=True)
+
+    quantize_dynamic(fp32_path, os.path.join(out_dir, "model_quantized.onnx"), weight_type=QuantType.QInt8)
+
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, "tokenizer.json"))
+    with open(os.path.join(out_dir, "embedding_config.json"), "w") as f:
+        json.dump({
+            "source_model": model_name,
+            "max_seq_length": st.max_seq_length,
+            "pad_id": tokenizer.pad_token_id,
+            "pad_token": tokenizer.pad_token,
+            "pooling": "mean"
+        }, f, indent=2)
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export an int8 ONNX copy of the embedding model")
+    parser.add_argument("--model", default=config.MODEL_NAME)
+    parser.add_argument("--out", default="", help="output directory")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    out = export(args.model, args.out or default_onnx_dir(config.CACHE_DIR, args.model), args.opset)
+    print(f"Exported {args.model} to {out}")
@@ -0,0 +1,155 @@
+"""Response encodings besides the default JSON, chosen with the Accept header.
+
+The compact schema keeps the numbers and drops the text: no feedback,
+details, summary or timings, and criterion scores become one list in a fixed
+order (CRITERIA). It is sent as JSON (through orjson when installed) or as
+MessagePack. Batch and job results can also be exported as an Arrow IPC
+stream or a Parquet file, one row per transcript. msgpack and pyarrow are
+optional; their media types are only offered when they are installed.
+"""
+import io
+import json
+import importlib.util
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+COMPACT_JSON = "application/vnd.analyzer.compact+json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+#older clients still send these
+ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK,
+           "application/x-parquet": PARQUET}
+
+#criteria in the order _analyze_doc returns them: the compact "scores" list and the table columns
+CRITERIA = ("salutation", "keywords", "flow", "speech_rate", "grammar", "vocabulary", "filler_words", "sentiment")
+
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+#offered for a single result, and for lists of results (batches, jobs)
+RESULT_TYPES = (JSON, COMPACT_JSON) + ((MSGPACK,) if msgpack is not None else ())
+TABLE_TYPES = RESULT_TYPES + ((ARROW, PARQUET) if HAS_ARROW else ())
+
+
+class NotAcceptable(Exception):
+    """Raised when the Accept header allows none of the offered media types"""
+
+
+def negotiate(accept, offered):
+    """The offered media type the client prefers (highest q, then offered order); JSON without an Accept header"""
+    if not accept or not accept.strip():
+        return offered[0]
+    ranges = []
+    for part in accept.split(","):
+        media_range, *params = [p.strip() for p in part.split(";")]
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_range = media_range.lower()
+        ranges.append((ALIASES.get(media_range, media_range), q))
+
+    best, best_q = None, 0.0
+    for media_type in offered:
+        kind = media_type.split("/")[0]
+        #the most specific matching range decides, as in RFC 9110
+        matches = [(3 if r == media_type else 2 if r == f"{kind}/*" else 1, q)
+                   for r, q in ranges if r in (media_type, f"{kind}/*", "*/*")]
+        if matches and max(matches)[1] > best_q:
+            best, best_q = media_type, max(matches)[1]
+    if best is None:
+        raise NotAcceptable(f"Available formats: {', '.join(offered)}")
+    return best
+
+
+def compact_result(result):
+    """Fixed numeric form of an AnalysisResult: {"overall_score", "word_count", "sentence_count",
+    "scores": [one per CRITERIA], "degraded": [criterion keys], "percentiles"?: {cohort: [n, overall, *criteria]}}"""
+    criteria = result["criteria_scores"]
+    compact = {
+        "overall_score": result["overall_score"],
+        "word_count": result["word_count"],
+        "sentence_count": result["sentence_count"],
+        "scores": [c["score"] for c in criteria],
+        "degraded": [key for key, c in zip(CRITERIA, criteria) if c["details"].get("degraded")],
+    }
+    if result.get("percentiles"):
+        compact["percentiles"] = {
+            cohort: [ranks["n"], ranks["overall"]] + [ranks["criteria"].get(c["metric"]) for c in criteria]
+            for cohort, ranks in result["percentiles"].items()}
+    return compact
+
+
+def compact_items(items):
+    """Batch or job entries ({"index", "result", "error", "name"?}) with compact results"""
+    return [dict(item, result=compact_result(item["result"]) if item.get("result") else None) for item in items]
+
+
+def encode(payload, media_type):
+    """Serialize a compact payload as JSON or MessagePack"""
+    if media_type == MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+#identifying columns of batch and job entries
+ENTRY_KEYS = (("index", "int32"), ("name", "string"))
+
+
+def to_table(items, keys=ENTRY_KEYS):
+    """pyarrow Table with one row per entry: the keys columns, error, and the compact schema's numbers"""
+    import pyarrow as pa
+    columns = {key: [] for key, _ in keys}
+    columns.update({"error": [], "overall_score": [], "word_count": [], "sentence_count": []})
+    columns.update({f"{key}_score": [] for key in CRITERIA})
+    columns["degraded"] = []
+    for item in items:
+        result = item.get("result") or {}
+        criteria = result.get("criteria_scores") or []
+        scores = [c["score"] for c in criteria] if len(criteria) == len(CRITERIA) else [None] * len(CRITERIA)
+        for key, _ in keys:
+            columns[key].append(item.get(key))
+        columns["error"].append(item.get("error"))
+        columns["overall_score"].append(result.get("overall_score"))
+        columns["word_count"].append(result.get("word_count"))
+        columns["sentence_count"].append(result.get("sentence_count"))
+        for key, score in zip(CRITERIA, scores):
+            columns[f"{key}_score"].append(score)
+        columns["degraded"].append(
+            [key for key, c in zip(CRITERIA, criteria) if c["details"].get("degraded")] if result else None)
+    schema = pa.schema(
+        [(key, pa.type_for_alias(kind)) for key, kind in keys]
+        + [("error", pa.string()), ("overall_score", pa.float64()), ("word_count", pa.int32()), ("sentence_count", pa.int32())]
+        + [(f"{key}_score", pa.float64()) for key in CRITERIA]
+        + [("degraded", pa.list_(pa.string()))])
+    return pa.table(columns, schema=schema)
+
+
+def encode_table(items, media_type):
+    """Serialize batch or job entries as an Arrow IPC stream or a Parquet file"""
+    import pyarrow as pa
+    table = to_table(items)
+    sink = io.BytesIO()
+    if media_type == PARQUET:
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
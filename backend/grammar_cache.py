@@ -0,0 +1,176 @@
+import json
+import bisect
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def match_dict(match):
+    """Plain, cacheable form of a language_tool_python Match (camelCase before 3.0, snake_case since)"""
+    issue_type = None
+    if hasattr(match, 'rule_issue_type'):
+        issue_type = match.rule_issue_type
+    elif hasattr(match, 'ruleIssueType'):
+        issue_type = match.ruleIssueType
+    elif hasattr(match, 'category'):
+        issue_type = match.category
+    elif hasattr(match, 'rule'):
+        issue_type = getattr(match.rule, 'category', None)
+    return {
+        "offset": match.offset,
+        "length": (getattr(match, 'error_length', None) or getattr(match, 'errorLength', None)
+                   or getattr(match, 'errorlength', 0)),
+        "rule_id": getattr(match, 'rule_id', None) or getattr(match, 'ruleId', None),
+        "issue_type": issue_type,
+        "message": getattr(match, 'message', ""),
+    }
+
+
+def segments(text, spans):
+    """(start, end) pieces covering text: each sentence plus the whitespace after it"""
+    if not text:
+        return []
+    starts = [start for start, _ in spans] or [0]
+    if starts[0] > 0:
+        starts.insert(0, 0)
+    return list(zip(starts, starts[1:] + [len(text)]))
+
+
+class GrammarCache:
+    """LanguageTool matches per sentence, keyed by a hash of the sentence text.
+
+    Offsets are stored relative to the sentence, so a cached sentence can be
+    placed anywhere in a later draft. Same layout as ResultCache: a bounded
+    in-memory LRU in front of an optional SQLite table.
+    """
+
+    def __init__(self, max_entries=20000, db_path=None, language="en-US"):
+        self.max_entries = max_entries
+        self.language = language
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self._connect()
+
+    def _connect(self):
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS sentence_matches (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+
+    def after_fork(self):
+        """New lock, counters and SQLite connection in a forked worker; cached entries are inherited"""
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self._connect()
+
+    def key(self, sentence):
+        return hashlib.sha256(f"{self.language}\0{sentence}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                value = self._entries.get(key)
+                if value is None and self._db is not None:
+                    row = self._db.execute("SELECT value FROM sentence_matches WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        value = row[0]
+                        self._remember(key, value)
+                if value is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = json.loads(value)
+        return found
+
+    def put_many(self, items):
+        values = [(key, json.dumps(matches)) for key, matches in items.items()]
+        with self._lock:
+            for key, value in values:
+                self._remember(key, value)
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO sentence_matches (key, value) VALUES (?, ?)", values)
+                self._db.commit()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM sentence_matches")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def check_incremental(check, text, spans, cache):
+    """Grammar matches for text, sending only uncached sentences to `check`.
+
+    Sentences are keyed by their text without surrounding whitespace. Each
+    contiguous run of uncached sentences is checked in one call, with the
+    cached sentence before it prepended as context so rules that look across
+    the sentence boundary see the real neighbour; matches inside that
+    neighbour are discarded. Each match is assigned to the sentence it starts
+    in and cached relative to it. Known differences from a full check: rules
+    that look ahead past the end of a run do not see the next sentence, and
+    matches in the whitespace between sentences (doubled spaces) are not kept.
+    Returns (matches with offsets into text, sentences served from cache,
+    sentences checked).
+    """
+    pieces = []
+    for start, end in segments(text, spans):
+        sentence = text[start:end]
+        lead = len(sentence) - len(sentence.lstrip())
+        pieces.append((start + lead, start + lead + len(sentence.strip())))
+    keys = [cache.key(text[start:end]) for start, end in pieces]
+    found = cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in found]
+
+    runs = []
+    for i in missing:
+        if runs and runs[-1][-1] == i - 1:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    fresh = {i: [] for i in missing}
+    starts = [start for start, _ in pieces]
+    for run in runs:
+        first = run[0] - 1 if run[0] > 0 else run[0]
+        origin = pieces[first][0]
+        for match in map(match_dict, check(text[origin:pieces[run[-1]][1]])):
+            offset = match["offset"] + origin
+            i = max(bisect.bisect_right(starts, offset) - 1, 0)
+            if i in fresh and offset < pieces[i][1]:
+                fresh[i].append(dict(match, offset=offset - pieces[i][0]))
+    if missing:
+        new = {keys[i]: fresh[i] for i in missing}
+        cache.put_many(new)
+        found.update(new)
+
+    matches = []
+    for (start, _), key in zip(pieces, keys):
+        matches += [dict(m, offset=m["offset"] + start) for m in found[key]]
+    return matches, len(pieces) - len(missing), len(missing)
@@ -0,0 +1,123 @@
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class PoolSaturated(Exception):
+    """Raised when the LanguageTool request queue is full"""
+
+
+class PoolTimeout(Exception):
+    """Raised when no backend answered within the per-call timeout"""
+
+
+class LanguageToolPool:
+    """A fixed set of LanguageTool backends behind a bounded request queue.
+
+    Each call borrows one idle backend. Callers wait for a free backend up to
+    `timeout` seconds; once `max_queue` callers are already waiting, new calls
+    fail fast with PoolSaturated. A backend whose call times out only goes
+    back to the pool after that call actually finishes.
+    """
+
+    def __init__(self, backends, max_queue=32, timeout=10.0):
+        self.size = len(backends)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._backends = list(backends)
+        self._reset()
+
+    def _reset(self):
+        self._idle = queue.Queue()
+        for backend in self._backends:
+            self._idle.put(backend)
+        self._executor = ThreadPoolExecutor(max_workers=max(self.size, 1), thread_name_prefix="languagetool")
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.calls = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._call_total = 0.0
+
+    @classmethod
+    def from_config(cls, urls=None, size=1, max_queue=32, timeout=10.0, language='en-US'):
+        """Connect to remote servers when urls are given, else start `size` local servers"""
+        import language_tool_python  #heavy; imported only when the pool is built
+        if urls:
+            backends = [language_tool_python.LanguageTool(language, remote_server=url) for url in urls]
+        else:
+            backends = [language_tool_python.LanguageTool(language) for _ in range(size)]
+        return cls(backends, max_queue=max_queue, timeout=timeout)
+
+    def after_fork(self):
+        """Fresh queue, executor and counters in a forked worker.
+
+        The backends themselves are kept: they are HTTP clients, so every
+        worker keeps talking to the same LanguageTool servers.
+        """
+        self._reset()
+
+    def check(self, text, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated(f"LanguageTool queue full ({self.max_queue} waiting)")
+            self._waiting += 1
+        start = time.monotonic()
+        try:
+            backend = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No LanguageTool backend free within {timeout:.1f}s")
+        finally:
+            waited = time.monotonic() - start
+            with self._lock:
+                self._waiting -= 1
+                self._waits += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+        future = self._executor.submit(backend.check, text)
+        #the backend is only reusable once its call is over, even after a timeout
+        future.add_done_callback(lambda _: self._idle.put(backend))
+        call_start = time.monotonic()
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"LanguageTool call exceeded {timeout:.1f}s")
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.calls += 1
+                self._call_total += time.monotonic() - call_start
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backends": self.size,
+                "idle": self._idle.qsize(),
+                "queue_depth": self._waiting,
+                "max_queue": self.max_queue,
+                "timeout_seconds": self.timeout,
+                "calls": self.calls,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "avg_wait_ms": round(self._wait_total / max(self._waits, 1) * 1000, 2),
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+                "avg_call_ms": round(self._call_total / max(self.calls, 1) * 1000, 2)
+            }
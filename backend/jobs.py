@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import closing
+
+QUEUED, RUNNING, COMPLETED, CANCELLED, FAILED = "queued", "running", "completed", "cancelled", "failed"
+FINISHED = (COMPLETED, CANCELLED, FAILED)
+
+
+class JobQueueFull(Exception):
+    """Raised when max_queued jobs are already waiting"""
+
+
+class JobStore:
+    """Analysis jobs and their transcripts in SQLite.
+
+    Every call opens its own short-lived connection, so one store can be used
+    from any thread, and by every worker process that serve.py forks. Claiming
+    the next job runs in a write transaction, so each job goes to exactly one
+    worker even when several processes share the file.
+    """
+
+    def __init__(self, path, busy_timeout=30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL,
+                    started_at REAL, finished_at REAL, heartbeat REAL, owner TEXT,
+                    total INTEGER NOT NULL, done INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0, error TEXT);
+                CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at);
+                CREATE TABLE IF NOT EXISTS job_items (
+                    job_id TEXT NOT NULL, idx INTEGER NOT NULL, name TEXT, transcript TEXT,
+                    duration_seconds INTEGER, use_cache INTEGER NOT NULL DEFAULT 1,
+                    done INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT,
+                    PRIMARY KEY (job_id, idx));
+            """)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def create(self, items, max_queued=0):
+        """Queue a job for items ({"transcript", "duration_seconds", "use_cache", "name", "error"}).
+
+        Items that arrive with an error (too short, unreadable upload) are stored
+        as already failed, so result indexes always match the submission.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        rows = [(job_id, i, item.get("name"), None if item.get("error") else item["transcript"],
+                 item.get("duration_seconds"), int(item.get("use_cache", True)),
+                 int(bool(item.get("error"))), item.get("error"))
+                for i, item in enumerate(items)]
+        failed = sum(row[6] for row in rows)
+        status = COMPLETED if failed == len(rows) else QUEUED
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if max_queued:
+                    waiting = db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+                    if waiting >= max_queued:
+                        raise JobQueueFull(f"{waiting} jobs already queued")
+                db.execute("INSERT INTO jobs (id, status, created_at, finished_at, total, done, failed) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (job_id, status, now, now if status == COMPLETED else None, len(rows), failed, failed))
+                db.executemany("INSERT INTO job_items (job_id, idx, name, transcript, duration_seconds, use_cache, "
+                               "done, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, owner):
+        """Mark the oldest queued job as running for owner and return its ID (None if the queue is empty)"""
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                                 (QUEUED,)).fetchone()
+                if row is not None:
+                    now = time.time()
+                    db.execute("UPDATE jobs SET status = ?, owner = ?, heartbeat = ?, "
+                               "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                               (RUNNING, owner, now, now, row["id"]))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return row["id"] if row is not None else None
+
+    def pending_items(self, job_id, limit):
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT idx, transcript, duration_seconds, use_cache FROM job_items "
+                              "WHERE job_id = ? AND done = 0 ORDER BY idx LIMIT ?", (job_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_results(self, job_id, outcomes):
+        """Store (idx, result, error) for a finished chunk; returns the job's status afterwards"""
+        rows = [(json.dumps(result) if result is not None else None, error, job_id, idx)
+                for idx, result, error in outcomes]
+        failed = sum(error is not None for _, _, error in outcomes)
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                #the transcript is dropped once scored; only results are kept
+                db.executemany("UPDATE job_items SET done = 1, result = ?, error = ?, transcript = NULL "
+                               "WHERE job_id = ? AND idx = ?", rows)
+                db.execute("UPDATE jobs SET done = done + ?, failed = failed + ?, heartbeat = ? WHERE id = ?",
+                           (len(rows), failed, time.time(), job_id))
+                row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return row["status"] if row is not None else None
+
+    def finish(self, job_id, status, error=None):
+        """Close a running job; a job cancelled meanwhile stays cancelled"""
+        with closing(self._connect()) as db:
+            db.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                       (status, error, time.time(), job_id, RUNNING))
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; False if it had already finished"""
+        with closing(self._connect()) as db:
+            cursor = db.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                                (CANCELLED, time.time(), job_id, QUEUED, RUNNING))
+        return cursor.rowcount > 0
+
+    def get(self, job_id, include_results=True):
+        with closing(self._connect()) as db:
+            job = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            items = []
+            if include_results:
+                items = db.execute("SELECT idx, name, result, error FROM job_items "
+                                   "WHERE job_id = ? AND done = 1 ORDER BY idx", (job_id,)).fetchall()
+        status = {
+            "job_id": job["id"],
+            "status": job["status"],
+            "total": job["total"],
+            "done": job["done"],
+            "failed": job["failed"],
+            "progress": round(job["done"] / job["total"], 4) if job["total"] else 1.0,
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "error": job["error"],
+        }
+        if include_results:
+            status["results"] = [{"index": row["idx"], "name": row["name"],
+                                  "result": json.loads(row["result"]) if row["result"] else None,
+                                  "error": row["error"]} for row in items]
+        return status
+
+    def recover(self, stale_seconds, dead_owner=None):
+        """Requeue running jobs whose worker is gone; their finished items are kept.
+
+        A job is orphaned when its owner is dead_owner (this process's own
+        name at startup, left over from a previous run), a process on this host
+        that no longer exists, or it has not reported progress for stale_seconds.
+        """
+        host = socket.gethostname()
+        now = time.time()
+        requeue = []
+        with closing(self._connect()) as db:
+            for row in db.execute("SELECT id, owner, heartbeat FROM jobs WHERE status = ?", (RUNNING,)):
+                owner_host, _, pid = (row["owner"] or "").rpartition(":")
+                gone = owner_host == host and pid.isdigit() and not _alive(int(pid))
+                if row["owner"] == dead_owner or gone or (row["heartbeat"] or 0) < now - stale_seconds:
+                    requeue.append(row["id"])
+            for job_id in requeue:
+                db.execute("UPDATE jobs SET status = ?, owner = NULL WHERE id = ? AND status = ?",
+                           (QUEUED, job_id, RUNNING))
+        return len(requeue)
+
+    def purge(self, older_than_seconds):
+        """Delete finished jobs (and their results) older than the retention period"""
+        cutoff = time.time() - older_than_seconds
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            old = [row["id"] for row in db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?", (*FINISHED, cutoff))]
+            db.executemany("DELETE FROM job_items WHERE job_id = ?", [(job_id,) for job_id in old])
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in old])
+            db.execute("COMMIT")
+        return len(old)
+
+    def counts(self):
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    """A fixed number of worker threads that score queued jobs.
+
+    Each worker claims a job and scores its pending items chunk_size at a time
+    with analyze_batch(), saving every chunk before starting the next. A
+    restarted process resumes a job after its last saved chunk. The number of
+    workers bounds how many analyses jobs can run at once, however many are queued.
+    """
+
+    def __init__(self, store, analyzer, workers=2, chunk_size=16, poll_seconds=2.0,
+                 stale_seconds=300.0, retention_seconds=0):
+        self.store = store
+        self.analyzer = analyzer
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.retention_seconds = retention_seconds
+        self.owner = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Recover jobs orphaned by a previous run and start the workers; no-op if running"""
+        if self._threads:
+            return self
+        #set here, not in __init__, so each process forked by serve.py gets its own name
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        recovered = self.store.recover(self.stale_seconds, dead_owner=self.owner)
+        if recovered:
+            print(f"Requeued {recovered} interrupted jobs")
+        self._stopping.clear()
+        self._threads = [threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop after the current chunks; unfinished jobs are resumed by the next start()"""
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake idle workers after a job is queued"""
+        self._wake.set()
+
+    def _loop(self):
+        last_sweep = 0.0
+        while not self._stopping.is_set():
+            try:
+                job_id = self.store.claim(self.owner)
+                if job_id is not None:
+                    self._run(job_id)
+                    continue
+                if time.monotonic() - last_sweep > self.stale_seconds / 4:
+                    last_sweep = time.monotonic()
+                    self.store.recover(self.stale_seconds)
+                    if self.retention_seconds:
+                        self.store.purge(self.retention_seconds)
+            except Exception as e:
+                print(f"Job worker error: {e}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _run(self, job_id):
+        try:
+            while not self._stopping.is_set():
+                items = self.store.pending_items(job_id, self.chunk_size)
+                if not items:
+                    self.store.finish(job_id, COMPLETED)
+                    return
+                outcomes = self.analyzer.analyze_batch(
+                    [(item["transcript"], item["duration_seconds"], bool(item["use_cache"])) for item in items],
+                    batch_size=self.chunk_size)
+                status = self.store.save_results(job_id, [(item["idx"], outcome["result"], outcome["error"])
+                                                          for item, outcome in zip(items, outcomes)])
+                if status != RUNNING:
+                    return
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.finish(job_id, FAILED, str(e))
@@ -0,0 +1,98 @@
+"""Minimal stand-in for a LanguageTool HTTP server, for local testing and benchmarks.
+
+Implements just enough of the /v2 API for language_tool_python's remote mode:
+/v2/languages and /v2/check, with a few toy rules. No Java required.
+
+    python lt_stub_server.py --port 8081 --delay 0.05
+    ANALYZER_LT_URLS=http://localhost:8081 uvicorn main:app
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LANGUAGES = [{"name": "English (US)", "code": "en", "longCode": "en-US"}]
+
+#(rule id, issue type, category, pattern, message)
+RULES = [
+    ("UPPERCASE_SENTENCE_START", "typographical", "CASING", re.compile(r'(?:^|[.!?]\s+)([a-z])'),
+     "This sentence does not start with an uppercase letter."),
+    ("I_LOWERCASE", "misspelling", "TYPOS", re.compile(r'\b(i)\b'),
+     "Did you mean \"I\"?"),
+    ("SUBJECT_VERB_AGREEMENT", "grammar", "GRAMMAR", re.compile(r'\b(?:i is|he are|she are|they is|we is)\b', re.I),
+     "Possible subject-verb agreement error."),
+]
+
+
+def check_text(text):
+    matches = []
+    for rule_id, issue_type, category, pattern, message in RULES:
+        for m in pattern.finditer(text):
+            start, end = m.span(m.lastindex or 0)
+            matches.append({
+                "message": message,
+                "shortMessage": "",
+                "replacements": [],
+                "offset": start,
+                "length": end - start,
+                "context": {"text": text[max(0, start - 20):end + 20], "offset": min(start, 20), "length": end - start},
+                "sentence": text,
+                "rule": {"id": rule_id, "description": message, "issueType": issue_type,
+                         "category": {"id": category, "name": category.title()}}
+            })
+    matches.sort(key=lambda m: m["offset"])
+    return {"matches": matches}
+
+
+def make_handler(delay):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/v2/languages"):
+                self._send(LANGUAGES)
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            if self.path.startswith("/v2/check"):
+                if delay:
+                    time.sleep(delay)
+                self._send(check_text(form.get("text", [""])[0]))
+            elif self.path.startswith("/v2/languages"):
+                self._send(LANGUAGES)
+            else:
+                self.send_error(404)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start(port=0, delay=0.0):
+    """Start the stub in a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to sleep per /v2/check call")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay))
+    print(f"LanguageTool stub listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
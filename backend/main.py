@@ -1,8 +1,25 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse, Response
+from starlette.concurrency import iterate_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from analyzer import TranscriptAnalyzer
-from typing import Optional
+from result_cache import ResultCache
+from grammar_pool import PoolSaturated
+from jobs import JobStore, JobRunner, JobQueueFull
+from uploads import UploadTooLarge, read_text_upload, open_archive, iter_archive
+from embeddings import EmbeddingBatcher
+from cohorts import CohortStore, CohortLimit, transcript_key
+import formats
+from metrics import REGISTRY, IN_FLIGHT, REQUEST_SECONDS
+import config
+from typing import Optional, Union
+from collections import deque
+import asyncio
+import zipfile
+import json
+import time
 
 app = FastAPI(title="Communication Skills Analyzer API")
 
@@ -14,10 +31,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if config.GZIP_MIN_BYTES > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=config.GZIP_MIN_BYTES, compresslevel=config.GZIP_LEVEL)
 
 class TranscriptInput(BaseModel):
     transcript: str
     duration_seconds: Optional[int] = None
+    use_cache: bool = True
+    #adds a per-stage timings block to the response, for debugging slow requests
+    include_timings: bool = False
+    #latency budget in ms; slow stages degrade to cheaper checks to meet it (default: ANALYZER_BUDGET_MS)
+    budget_ms: Optional[float] = None
+    #cohort names (e.g. "school-12/grade-7") to rank this transcript's scores within, and then add it to
+    cohort: Optional[Union[str, list[str]]] = None
 
 class CriterionResult(BaseModel):
     criterion: str
@@ -35,11 +61,169 @@ class AnalysisResult(BaseModel):
     sentence_count: int
     criteria_scores: list[CriterionResult]
     summary: str
+    degraded: list[str] = []
+    timings: Optional[dict] = None
+    #{cohort: {"n", "overall", "criteria": {metric: percentile}}} when the request named cohorts
+    percentiles: Optional[dict] = None
+
+class BatchInput(BaseModel):
+    items: list[TranscriptInput]
+
+class BatchItemResult(BaseModel):
+    index: int
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    results: list[BatchItemResult]
+
+class JobInput(BaseModel):
+    items: list[TranscriptInput]
+
+class JobItemResult(BatchItemResult):
+    name: Optional[str] = None
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    done: int
+    failed: int
+    progress: float
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    results: Optional[list[JobItemResult]] = None
+
+#the media types besides JSON that endpoints can answer with, for the OpenAPI docs
+RESULT_FORMATS = {200: {"content": {media_type: {} for media_type in formats.RESULT_TYPES[1:]}}}
+TABLE_FORMATS = {200: {"content": {media_type: {} for media_type in formats.TABLE_TYPES[1:]}}}
 
 print("Loading analyzer models...")
-analyzer = TranscriptAnalyzer()
+cache = None
+if config.RESULT_CACHE_SIZE > 0:
+    cache = ResultCache(config.RESULT_CACHE_SIZE, config.RESULT_CACHE_DB or None, config.RESULT_CACHE_DB_MAX_ROWS)
+analyzer = TranscriptAnalyzer(cache=cache, lazy=config.LAZY_LOAD)
+if config.RUBRIC_WATCH_SECONDS > 0:
+    analyzer.watch_rubric(config.RUBRIC_WATCH_SECONDS)
+job_store = JobStore(config.JOB_DB)
+jobs = JobRunner(job_store, analyzer, workers=config.JOB_WORKERS, chunk_size=config.JOB_CHUNK_SIZE,
+                 stale_seconds=config.JOB_STALE_SECONDS, retention_seconds=config.JOB_RETENTION_HOURS * 3600)
+cohort_store = CohortStore(config.COHORT_FILE or None, k=config.COHORT_SKETCH_K, max_cohorts=config.COHORT_MAX,
+                           dedupe_bits=config.COHORT_DEDUPE_BITS)
 print("Server ready!")
 
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        IN_FLIGHT.dec()
+        #label by route template (/jobs/{id}), not the raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        REQUEST_SECONDS.observe(time.perf_counter() - start, path=path, status=str(status))
+
+def collect_component_metrics():
+    families = []
+    if cache is not None:
+        stats = cache.stats()
+        families.append(("analyzer_cache_entries", "gauge", "Results held in the in-memory cache",
+                         [({}, stats["entries"])]))
+        families.append(("analyzer_cache_disk_hits_total", "counter", "Cache hits served from SQLite",
+                         [({}, stats["disk_hits"])]))
+    grammar = analyzer._components["grammar"]
+    if grammar.ready:
+        stats = grammar.value.stats()
+        families.append(("languagetool_queue_depth", "gauge", "Grammar checks waiting for a backend",
+                         [({}, stats["queue_depth"])]))
+        families.append(("languagetool_idle_backends", "gauge", "LanguageTool backends not in use",
+                         [({}, stats["idle"])]))
+        families.append(("languagetool_rejected_total", "counter", "Grammar checks rejected by a full queue",
+                         [({}, stats["rejected"])]))
+        families.append(("languagetool_timeouts_total", "counter", "Grammar checks that timed out",
+                         [({}, stats["timeouts"])]))
+    families.append(("analyzer_jobs", "gauge", "Jobs in the job store by status",
+                     [({"status": status}, n) for status, n in sorted(job_store.counts().items())]))
+    families.append(("analyzer_component_ready", "gauge", "1 once a component has loaded",
+                     [({"component": name}, int(c["state"] == "ready"))
+                      for name, c in analyzer.status()["components"].items()]))
+    return families
+
+REGISTRY.add_collector(collect_component_metrics)
+
+@app.on_event("startup")
+def start_loading():
+    #lazy mode: models load in the background while the server already accepts requests
+    analyzer.start_loading()
+    #started per process, so every worker forked by serve.py runs its own job threads
+    if config.JOB_WORKERS > 0:
+        jobs.start()
+    cohort_store.start_autosave(config.COHORT_SAVE_SECONDS)
+
+@app.on_event("shutdown")
+def stop_jobs():
+    #a chunk cut short here is scored again when the job is resumed
+    jobs.stop(timeout=5)
+    cohort_store.stop()
+
+def _cohort_names(cohort):
+    """The cohort field as a list of distinct names; 400 for too many or overlong names"""
+    if cohort is None:
+        return []
+    names = [cohort] if isinstance(cohort, str) else cohort
+    names = list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+    if len(names) > config.COHORT_MAX_PER_REQUEST:
+        raise HTTPException(status_code=400,
+                            detail=f"Too many cohorts (maximum {config.COHORT_MAX_PER_REQUEST} per transcript)")
+    if any(len(name) > 200 for name in names):
+        raise HTTPException(status_code=400, detail="Cohort name too long (maximum 200 characters)")
+    return names
+
+def _single_only(items, fields=("budget_ms", "include_timings")):
+    """400 when an item sets a field that only single analyses honour, rather than silently dropping it"""
+    for i, item in enumerate(items):
+        used = [field for field in fields if getattr(item, field) not in (None, False)]
+        if used:
+            raise HTTPException(status_code=400,
+                                detail=f"Item {i}: {', '.join(used)} not supported here; use POST /analyze")
+
+def _accepted(request, offered):
+    """Response media type negotiated from the Accept header; 406 when none of offered is acceptable"""
+    try:
+        return formats.negotiate(request.headers.get("accept"), offered)
+    except formats.NotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+def _render(result, media_type):
+    """An AnalysisResult as is for JSON, else in the compact schema"""
+    if media_type == formats.JSON:
+        return result
+    return Response(formats.encode(formats.compact_result(result), media_type), media_type=media_type)
+
+def _render_items(payload, media_type, headers=None):
+    """A payload with a "results" list (batch, job) as is for JSON, in the compact schema, or as a table"""
+    if media_type == formats.JSON:
+        return payload
+    items = payload.get("results") or []
+    if media_type in (formats.ARROW, formats.PARQUET):
+        return Response(formats.encode_table(items, media_type), media_type=media_type, headers=headers)
+    compact = dict(payload, results=formats.compact_items(items))
+    return Response(formats.encode(compact, media_type), media_type=media_type)
+
+def _with_percentiles(result, cohorts, transcript):
+    """Add percentile ranks within cohorts to a result, recording it there unless the transcript
+    was counted before (a resubmission or a cache hit); raises CohortLimit"""
+    if not cohorts:
+        return result
+    return dict(result, percentiles=cohort_store.rank_and_record(cohorts, result, transcript_key(transcript)))
+
 @app.get("/")
 def root():
     return {
@@ -47,56 +231,405 @@ def root():
         "status": "running",
         "endpoints": {
             "POST /analyze": "Analyze transcript from JSON",
-            "POST /analyze/file": "Analyze transcript from .txt file"
+            "POST /analyze/file": "Analyze transcript from .txt file",
+            "POST /analyze/batch": "Analyze many transcripts in one request",
+            "POST /analyze/archive": "Analyze every .txt file in a .zip upload, streaming NDJSON results",
+            "WS /analyze/stream": "Send transcript chunks, receive updated scores after each",
+            "POST /jobs": "Queue transcripts for background analysis, returns a job ID",
+            "POST /jobs/file": "Queue uploaded .txt files for background analysis",
+            "GET /jobs/{job_id}": "Job progress and results",
+            "DELETE /jobs/{job_id}": "Cancel a queued or running job",
+            "GET /cohorts": "Number of cohorts with percentile sketches",
+            "GET /cohorts/{cohort}": "Score quantiles of one cohort",
+            "GET /cache/stats": "Result cache hit/miss counters",
+            "GET /grammar/stats": "LanguageTool pool queue depth and wait times",
+            "GET /embedding/stats": "Batch sizes of the cross-request embedding batcher",
+            "GET /metrics": "Prometheus metrics: stage latencies, fallbacks, cache hits, in-flight requests",
+            "POST /admin/rubric/reload": "Recompile rubric.py and swap it in without restarting",
+            "GET /health/live": "Liveness probe",
+            "GET /health/ready": "Readiness probe with per-component load state"
         }
     }
 
-@app.post("/analyze", response_model=AnalysisResult)
-def analyze_transcript(input_data: TranscriptInput):
+@app.post("/analyze", response_model=AnalysisResult, responses=RESULT_FORMATS)
+async def analyze_transcript(input_data: TranscriptInput, request: Request):
     """Analyze transcript from JSON input"""
     if not input_data.transcript or len(input_data.transcript.strip()) < 10:
         raise HTTPException(status_code=400, detail="Transcript too short (minimum 10 characters)")
+    cohorts = _cohort_names(input_data.cohort)
+    media_type = _accepted(request, formats.RESULT_TYPES)
     
     try:
-        result = analyzer.analyze(
+        result = await analyzer.analyze_async(
             input_data.transcript, 
-            input_data.duration_seconds
+            input_data.duration_seconds,
+            use_cache=input_data.use_cache,
+            include_timings=input_data.include_timings,
+            budget_ms=input_data.budget_ms
         )
-        return result
+        return _render(_with_percentiles(result, cohorts, input_data.transcript), media_type)
+    except CohortLimit as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=f"Grammar checker busy, retry later: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
-@app.post("/analyze/file", response_model=AnalysisResult)
+@app.post("/analyze/batch", response_model=BatchResult, responses=TABLE_FORMATS)
+async def analyze_batch(batch: BatchInput, request: Request):
+    """Analyze a list of transcripts, returning results in input order"""
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(batch.items) > config.MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large (maximum {config.MAX_BATCH_ITEMS} transcripts)")
+    _single_only(batch.items)
+    media_type = _accepted(request, formats.TABLE_TYPES)
+    
+    #short transcripts get a per-item error instead of failing the whole batch
+    valid = [i for i, item in enumerate(batch.items)
+             if item.transcript and len(item.transcript.strip()) >= 10]
+    results = [{"index": i, "result": None, "error": "Transcript too short (minimum 10 characters)"}
+               for i in range(len(batch.items))]
+    cohorts = [_cohort_names(item.cohort) for item in batch.items]
+    
+    try:
+        analyzed = await analyzer.analyze_batch_async(
+            [(batch.items[i].transcript, batch.items[i].duration_seconds, batch.items[i].use_cache)
+             for i in valid]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
+    
+    for i, item in zip(valid, analyzed):
+        if item["result"] is not None:
+            try:
+                item["result"] = _with_percentiles(item["result"], cohorts[i], batch.items[i].transcript)
+            except CohortLimit as e:
+                item = {"result": None, "error": str(e)}
+        results[i] = {**item, "index": i}
+    return _render_items({"results": results}, media_type)
+
+@app.post("/analyze/file", response_model=AnalysisResult, responses=RESULT_FORMATS)
 async def analyze_file(
+    request: Request,
     file: UploadFile = File(...),
-    duration_seconds: Optional[int] = Form(None)
+    duration_seconds: Optional[int] = Form(None),
+    use_cache: bool = Form(True),
+    include_timings: bool = Form(False),
+    budget_ms: Optional[float] = Form(None),
+    cohort: Optional[list[str]] = Form(None)
 ):
     """Analyze transcript from uploaded .txt file"""
     
     #validate file type
     if not file.filename.endswith('.txt'):
         raise HTTPException(status_code=400, detail="Only .txt files are supported")
+    cohorts = _cohort_names(cohort)
+    media_type = _accepted(request, formats.RESULT_TYPES)
     
     try:
-        #read file content
-        content = await file.read()
-        transcript = content.decode('utf-8')
+        #decode in chunks, stopping at the size cap instead of reading the whole upload first
+        transcript = await read_text_upload(file, config.MAX_TRANSCRIPT_BYTES)
         
         if len(transcript.strip()) < 10:
             raise HTTPException(status_code=400, detail="Transcript too short (minimum 10 characters)")
         
         #analyze
-        result = analyzer.analyze(transcript, duration_seconds)
-        return result
+        result = await analyzer.analyze_async(transcript, duration_seconds, use_cache=use_cache,
+                                              include_timings=include_timings, budget_ms=budget_ms)
+        return _render(_with_percentiles(result, cohorts, transcript), media_type)
         
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except CohortLimit as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=f"Grammar checker busy, retry later: {str(e)}")
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="File encoding error. Please use UTF-8 encoded .txt file")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
+@app.post("/analyze/archive")
+async def analyze_archive(
+    request: Request,
+    file: UploadFile = File(...),
+    use_cache: bool = Form(True),
+    budget_ms: Optional[float] = Form(None),
+    cohort: Optional[list[str]] = Form(None)
+):
+    """Analyze every .txt file in a .zip archive.
+    
+    Responds with NDJSON: one {"type": "result", "index", "name", "result", "error"}
+    line per file, sent as soon as that file is scored, then a {"type": "summary"} line.
+    With cohort set, each file is ranked within the cohorts in archive order.
+    """
+    if not file.filename.lower().endswith('.zip'):
+        raise HTTPException(status_code=400, detail="Only .zip archives are supported")
+    cohorts = _cohort_names(cohort)
+    length = request.headers.get("content-length")
+    if (length and length.isdigit() and int(length) > config.ARCHIVE_MAX_BYTES) or \
+            (file.size or 0) > config.ARCHIVE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Archive larger than {config.ARCHIVE_MAX_BYTES} bytes")
+    try:
+        #the upload is spooled to a temporary file; the archive is read from there entry by entry
+        archive, entries = await asyncio.get_running_loop().run_in_executor(
+            None, open_archive, file.file, config.ARCHIVE_MAX_ENTRIES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Not a valid .zip archive")
+    return StreamingResponse(_archive_lines(archive, entries, use_cache, budget_ms, cohorts),
+                             media_type="application/x-ndjson")
+
+async def _score_entry(text, use_cache, budget_ms, cohorts):
+    try:
+        result = await analyzer.analyze_async(text, use_cache=use_cache, budget_ms=budget_ms)
+        return _with_percentiles(result, cohorts, text), None
+    except CohortLimit as e:
+        return None, str(e)
+    except PoolSaturated as e:
+        return None, f"Grammar checker busy, retry later: {str(e)}"
+    except Exception as e:
+        return None, f"Analysis error: {str(e)}"
+
+async def _archive_lines(archive, entries, use_cache, budget_ms, cohorts):
+    #extraction runs in a worker thread while up to ARCHIVE_CONCURRENCY files are scored;
+    #lines go out in archive order, so at most that many transcripts are held at once
+    window = deque()
+    counts = {"total": 0, "scored": 0, "failed": 0}
+
+    async def emit():
+        index, name, task, error = window.popleft()
+        result = None
+        if task is not None:
+            result, error = await task
+        counts["total"] += 1
+        counts["failed" if error else "scored"] += 1
+        return json.dumps({"type": "result", "index": index, "name": name, "result": result, "error": error}) + "\n"
+
+    try:
+        index = 0
+        async for name, text, error in iterate_in_threadpool(
+                iter_archive(archive, entries, config.MAX_TRANSCRIPT_BYTES)):
+            if error is None and len(text.strip()) < 10:
+                error = "Transcript too short (minimum 10 characters)"
+            task = asyncio.ensure_future(_score_entry(text, use_cache, budget_ms, cohorts)) if error is None else None
+            window.append((index, name, task, error))
+            index += 1
+            if len(window) >= max(config.ARCHIVE_CONCURRENCY, 1):
+                yield await emit()
+        while window:
+            yield await emit()
+        yield json.dumps({"type": "summary", **counts}) + "\n"
+    finally:
+        #client went away: drop what is still queued
+        for _, _, task, _ in window:
+            if task is not None:
+                task.cancel()
+        archive.close()
+
+@app.websocket("/analyze/stream")
+async def analyze_stream(websocket: WebSocket):
+    """Live analysis: each message is {"text", "elapsed_seconds"?, "final"?}.
+    
+    Replies with an "update" result after every chunk and a "final" result
+    (same scoring as POST /analyze) when "final" is true, then closes. The
+    final message may also carry POST /analyze's use_cache, include_timings
+    and budget_ms.
+    """
+    await websocket.accept()
+    session = analyzer.stream_session()
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                return
+            try:
+                message = json.loads(frame.get("text") or frame.get("bytes") or "")
+                if not isinstance(message, dict):
+                    raise ValueError("expected a JSON object")
+                text = message.get("text") or ""
+                elapsed = message.get("elapsed_seconds")
+                if not isinstance(text, str) or not isinstance(elapsed, (int, float, type(None))):
+                    raise ValueError('"text" must be a string and "elapsed_seconds" a number')
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": f"Invalid message: {str(e)}"})
+                continue
+            if session.bytes_received + len(text.encode("utf-8")) > config.MAX_TRANSCRIPT_BYTES:
+                await websocket.send_json({"type": "error",
+                                           "detail": f"Transcript larger than {config.MAX_TRANSCRIPT_BYTES} bytes"})
+                await websocket.close(code=1009)
+                return
+            try:
+                if message.get("final"):
+                    if len((session.transcript + text).strip()) < 10:
+                        await websocket.send_json({"type": "error", "detail": "Transcript too short (minimum 10 characters)"})
+                        continue
+                    if text:
+                        await analyzer.run_blocking(session.feed, text, elapsed)
+                    result = await analyzer.run_blocking(
+                        session.finish, elapsed, message.get("use_cache", True),
+                        message.get("include_timings", False), message.get("budget_ms"))
+                    await websocket.send_json(result)
+                    await websocket.close()
+                    return
+                result = await analyzer.run_blocking(session.feed, text, elapsed)
+            except PoolSaturated as e:
+                await websocket.send_json({"type": "error", "detail": f"Grammar checker busy, retry later: {str(e)}"})
+                continue
+            except Exception as e:
+                await websocket.send_json({"type": "error", "detail": f"Analysis error: {str(e)}"})
+                continue
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
+
+def _queue_job(items):
+    try:
+        job_id = job_store.create(items, max_queued=config.JOB_MAX_QUEUED)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Job queue full, retry later: {str(e)}")
+    jobs.notify()
+    return job_store.get(job_id, include_results=False)
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+def create_job(job: JobInput):
+    """Queue transcripts for background scoring; poll GET /jobs/{job_id} for results"""
+    if not job.items:
+        raise HTTPException(status_code=400, detail="Job is empty")
+    if len(job.items) > config.JOB_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Job too large (maximum {config.JOB_MAX_ITEMS} transcripts)")
+    _single_only(job.items, ("budget_ms", "include_timings", "cohort"))
+    items = []
+    for item in job.items:
+        error = None
+        if not item.transcript or len(item.transcript.strip()) < 10:
+            error = "Transcript too short (minimum 10 characters)"
+        items.append({"transcript": item.transcript, "duration_seconds": item.duration_seconds,
+                      "use_cache": item.use_cache, "error": error})
+    return _queue_job(items)
+
+@app.post("/jobs/file", response_model=JobStatus, status_code=202)
+async def create_file_job(
+    files: list[UploadFile] = File(...),
+    use_cache: bool = Form(True)
+):
+    """Queue uploaded .txt files as one job; results are named after the files"""
+    if len(files) > config.JOB_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Job too large (maximum {config.JOB_MAX_ITEMS} files)")
+    items = []
+    for file in files:
+        item = {"name": file.filename, "transcript": None, "use_cache": use_cache, "error": None}
+        if not file.filename.endswith('.txt'):
+            item["error"] = "Only .txt files are supported"
+        else:
+            try:
+                item["transcript"] = await read_text_upload(file, config.MAX_TRANSCRIPT_BYTES)
+                if len(item["transcript"].strip()) < 10:
+                    item["error"] = "Transcript too short (minimum 10 characters)"
+            except UploadTooLarge as e:
+                item["error"] = str(e)
+            except UnicodeDecodeError:
+                item["error"] = "File encoding error. Please use UTF-8 encoded .txt file"
+        items.append(item)
+    return await asyncio.get_running_loop().run_in_executor(None, _queue_job, items)
+
+@app.get("/jobs/{job_id}", response_model=JobStatus, responses=TABLE_FORMATS)
+def job_status(job_id: str, request: Request, include_results: bool = True):
+    """Progress, and the results scored so far (all of them once status is "completed")"""
+    media_type = _accepted(request, formats.TABLE_TYPES)
+    status = job_store.get(job_id, include_results=include_results)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    #a table has no room for the job fields, so the status travels in headers
+    return _render_items(status, media_type, headers={"X-Job-Status": status["status"],
+                                                      "X-Job-Progress": str(status["progress"])})
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+def cancel_job(job_id: str):
+    """Cancel a job; results scored before the cancellation are kept"""
+    if not job_store.cancel(job_id):
+        if job_store.get(job_id, include_results=False) is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail="Job already finished")
+    return job_store.get(job_id, include_results=False)
+
+@app.get("/cohorts")
+def cohort_stats():
+    """Cohorts held, and values recorded here but not yet merged into the cohort file"""
+    return cohort_store.stats()
+
+@app.get("/cohorts/{cohort:path}")
+def cohort_summary(cohort: str):
+    """Count, range and approximate quantiles of each metric in a cohort"""
+    summary = cohort_store.summary(cohort)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Cohort not found")
+    return {"cohort": cohort, "metrics": summary}
+
+@app.get("/cache/stats")
+def cache_stats():
+    if analyzer.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **analyzer.cache.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/grammar/stats")
+def grammar_stats():
+    component = analyzer.status()["components"]["grammar"]
+    if component["state"] != "ready":
+        return component
+    stats = analyzer.grammar_pool.stats()
+    if analyzer.grammar_cache is not None:
+        stats["sentence_cache"] = analyzer.grammar_cache.stats()
+    return stats
+
+@app.get("/embedding/stats")
+def embedding_stats():
+    """Batch sizes achieved by the cross-request embedding batcher"""
+    component = analyzer.status()["components"]["embedding"]
+    if component["state"] != "ready":
+        return component
+    model = analyzer.model
+    if not isinstance(model, EmbeddingBatcher):
+        return {"batching": False, "backend": model.name}
+    return {"batching": True, "backend": model.name, **model.stats()}
+
+@app.post("/admin/rubric/reload")
+async def reload_rubric():
+    """Recompile rubric.py off the event loop; requests keep using the old plan until the swap"""
+    previous = analyzer.rubric_version
+    try:
+        version = await asyncio.get_running_loop().run_in_executor(None, analyzer.reload_plan)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Rubric reload failed, keeping {previous}: {str(e)}")
+    return {"rubric_version": version, "previous_version": previous}
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "models_loaded": True}
+    status = analyzer.status()
+    return {
+        "status": "healthy",
+        "models_loaded": status["ready"],
+        "components": status["components"],
+        "rubric_version": analyzer.rubric_version
+    }
+
+@app.get("/health/live")
+def liveness():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness():
+    status = analyzer.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,199 @@
+import time
+import threading
+from contextlib import contextmanager
+
+#upper bounds in seconds; covers sub-millisecond scorers up to multi-second LanguageTool calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+WORD_BUCKETS = (25, 50, 100, 200, 400, 800, 1600, 3200, 6400, 12800)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(labels[n] for n in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines += self._samples(key, value)
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_label_text(self.label_names, key)} {_number(value)}"]
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self, key, state):
+        counts, total, count = state
+        names = self.label_names + ("le",)
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            lines.append(f"{self.name}_bucket{_label_text(names, key + (_number(bound),))} {cumulative}")
+        labels = _label_text(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_number(round(total, 6))}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text exposition format.
+
+    Besides owned metrics, collectors are callables run at scrape time that
+    return (name, kind, help, [(labels_dict, value), ...]) tuples, for values
+    other components already count (cache hits, LanguageTool queue depth).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def after_fork(self):
+        """Start a forked worker from zero, so it doesn't also report what its parent recorded"""
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "analyzer_stage_seconds", "Time spent in each analysis stage", ("stage",))
+ANALYSIS_SECONDS = REGISTRY.histogram(
+    "analyzer_analysis_seconds", "Time for a whole analysis, including cache lookups", ("cache",))
+GRAMMAR_FALLBACKS = REGISTRY.counter(
+    "analyzer_grammar_fallback_total", "Grammar checks served by the basic check instead of LanguageTool", ("reason",))
+DEGRADED = REGISTRY.counter(
+    "analyzer_degraded_total", "Criteria scored by a cheaper fallback path", ("metric", "reason"))
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    "analyzer_embedding_batch_size", "Texts per model call made by the embedding batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+GRAMMAR_SENTENCES = REGISTRY.counter(
+    "analyzer_grammar_sentences_total", "Sentences served from the grammar cache or sent to LanguageTool", ("result",))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "analyzer_cache_lookups_total", "Result cache lookups by outcome", ("result",))
+TRANSCRIPT_WORDS = REGISTRY.histogram(
+    "analyzer_transcript_words", "Words per analyzed transcript", buckets=WORD_BUCKETS)
+TRANSCRIPT_CHARS = REGISTRY.histogram(
+    "analyzer_transcript_chars", "Characters per analyzed transcript", buckets=tuple(b * 6 for b in WORD_BUCKETS))
+IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled")
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "HTTP request latency", ("path", "status"))
@@ -0,0 +1,63 @@
+import re
+from collections import namedtuple
+
+PhraseHit = namedtuple("PhraseHit", "start end phrase group label")
+
+
+class PhraseMatcher:
+    """Finds every rubric phrase in a text with one compiled regex pass.
+
+    Phrases are matched case-insensitively on word boundaries; a trailing `*`
+    lets a phrase continue into a longer word ("thank*" matches "thanks").
+    The same phrase may be registered under several (group, label) pairs, and
+    overlapping hits are reported: a lookahead tries every start position, and
+    shorter phrases that also match at the start of the longest hit are added.
+    """
+
+    def __init__(self, entries):
+        """entries: iterable of (phrase, group, label)"""
+        labels = {}
+        for phrase, group, label in entries:
+            labels.setdefault(phrase.lower(), []).append((group, label))
+
+        #longest first, so the alternation prefers the longest phrase at each position
+        self.phrases = sorted(labels, key=lambda p: (-len(p.rstrip('*')), p))
+        self._labels = [labels[p] for p in self.phrases]
+        regexes = [self._regex(p) for p in self.phrases]
+        alternation = "|".join(f"(?P<p{i}>{rx})" for i, rx in enumerate(regexes))
+        self._pattern = re.compile(rf"(?<!\w)(?=(?:{alternation}))")
+
+        #other phrases that can start where each phrase starts; confirmed per hit
+        self._singles = [re.compile(rx) for rx in regexes]
+        literals = [p.rstrip('*') for p in self.phrases]
+        self._prefixes = [[j for j, other in enumerate(literals) if j != i and literal.startswith(other)]
+                          for i, literal in enumerate(literals)]
+
+    @staticmethod
+    def _regex(phrase):
+        if phrase.endswith('*'):
+            return re.escape(phrase[:-1]) + r"\w*"
+        return re.escape(phrase) + r"(?!\w)"
+
+    def find_all(self, text_lower):
+        """All hits in a lowercase text, ordered by start position"""
+        hits = []
+        for m in self._pattern.finditer(text_lower):
+            name = m.lastgroup
+            i = int(name[1:])
+            start, end = m.span(name)
+            for group, label in self._labels[i]:
+                hits.append(PhraseHit(start, end, self.phrases[i], group, label))
+            for j in self._prefixes[i]:
+                sub = self._singles[j].match(text_lower, start)
+                if sub:
+                    for group, label in self._labels[j]:
+                        hits.append(PhraseHit(start, sub.end(), self.phrases[j], group, label))
+        return hits
+
+    def group_hits(self, text_lower):
+        """Hits bucketed by group: {group: [PhraseHit, ...]}"""
+        grouped = {}
+        for hit in self.find_all(text_lower):
+            grouped.setdefault(hit.group, []).append(hit)
+        return grouped
@@ -0,0 +1,105 @@
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Content-addressed cache of analysis results.
+
+    A bounded in-memory LRU sits in front of an optional SQLite table, so
+    results survive restarts when db_path is set. The table keeps the
+    max_disk_entries most recently written results (0 = unbounded). Values
+    are stored as JSON strings, which means every hit hands back a fresh copy.
+    """
+
+    def __init__(self, max_entries=1024, db_path=None, max_disk_entries=0):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._connect()
+
+    def _connect(self):
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._prune()
+            self._db.commit()
+
+    def after_fork(self):
+        """New lock, counters and SQLite connection in a forked worker; cached entries are inherited"""
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+        self._connect()
+
+    @staticmethod
+    def make_key(text, duration_sec, rubric_version, model_version, settings=()):
+        """Key on the normalized transcript plus everything that changes the result"""
+        payload = json.dumps([text.strip(), duration_sec or None, rubric_version, model_version, list(settings)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(value)
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self._remember(key, row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        value = json.dumps(result)
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, value))
+                self._prune()
+                self._db.commit()
+
+    def _prune(self):
+        #REPLACE gives a rewritten row a new rowid, so the highest rowids are the latest writes
+        if self.max_disk_entries > 0:
+            self._db.execute("DELETE FROM results WHERE rowid <= (SELECT MAX(rowid) FROM results) - ?",
+                             (self.max_disk_entries,))
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+                "max_disk_entries": self.max_disk_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -1,3 +1,12 @@
+import json
+import hashlib
+
+#Scoring rubric. The analyzer compiles this into a ScoringPlan at startup and on
+#reload (POST /admin/rubric/reload), so edits here apply without a restart.
+#
+#Keyword phrases match whole words; a trailing * also accepts longer words.
+#Score bands are [op, bound, score] rows checked top to bottom; "otherwise"
+#applies when no row matches.
 RUBRIC = {
     "content_structure": {
         "weight": 40,
@@ -16,49 +25,65 @@ RUBRIC = {
                 "must_have": {
                     "max_score": 20,
                     "per_item": 4,
-                    "items": ["name", "age", "school", "class", "family", "hobbies", "interest"]
+                    "semantic_per_item": 2,
+                    "semantic_threshold": 0.3,
+                    "items": {
+                        "name": ["name", "myself", "i am", "i'm"],
+                        "age": ["age", "years old", "year old"],
+                        "school": ["school", "college", "university", "class"],
+                        "family": ["family", "parents", "mother", "father", "siblings"],
+                        "hobbies": ["hobby", "hobbies", "enjoy*", "like to", "love to", "play*"]
+                    }
                 },
                 "good_to_have": {
                     "max_score": 10,
                     "per_item": 2,
-                    "items": ["origin", "dream", "goal", "ambition", "fun fact", "unique", "strength", "achievement"]
+                    "items": {
+                        "goals": ["dream*", "goal*", "ambition", "want to", "aspire"],
+                        "unique": ["fun fact", "unique", "special", "different"],
+                        "achievements": ["achievement*", "strength*", "good at"]
+                    }
                 }
             },
             "flow": {
                 "weight": 5,
-                "order": ["salutation", "name", "basic_details", "additional_details", "closing"],
-                "followed": 5,
-                "not_followed": 0
+                "greeting": {"score": 2, "within_first": 50, "keywords": ["hello", "hi", "good"]},
+                "name": {"score": 2, "within_first": 100, "keywords": ["my name", "myself", "i am", "i'm"]},
+                "closing": {"score": 1, "within_last": 100, "keywords": ["thank*", "that's all", "that is all"]}
             }
         }
     },
     "speech_rate": {
         "weight": 10,
         "metric": "wpm",
-        "levels": {
-            "too_fast": {"range": [161, 999], "score": 2},
-            "fast": {"range": [141, 160], "score": 6},
-            "ideal": {"range": [111, 140], "score": 10},
-            "slow": {"range": [81, 110], "score": 6},
-            "too_slow": {"range": [0, 80], "score": 2}
-        }
+        #duration used when none is given: max(min_seconds, words / words_per_second)
+        "default_duration": {"min_seconds": 30, "words_per_second": 2},
+        "ideal": [111, 140],
+        "bands": [[">", 161, 2], [">", 140, 6], [">=", 111, 10], [">=", 81, 6]],
+        "otherwise": 2
     },
     "language_grammar": {
         "weight": 20,
         "metrics": {
             "grammar": {
                 "weight": 10,
-                "formula": "1 - min(errors_per_100_words / 10, 1)",
-                "levels": {
-                    ">0.9": 10, "0.7-0.89": 8, "0.5-0.69": 6, "0.3-0.49": 4, "<0.3": 2
+                "metric": "errors_per_100_words",
+                "counted_issue_types": ["grammar", "misspelling", "typographical", "possible_typo", "grammar_error"],
+                #when no match has a counted type, count up to this many matches of any type
+                "fallback_max_matches": 10,
+                "bands": [["<=", 1, 10], ["<=", 2, 8], ["<=", 4, 6], ["<=", 7, 4]],
+                "otherwise": 2,
+                "basic": {
+                    "patterns": [r"\bi is\b", r"\bhe are\b", r"\bthey is\b", r"\bwe is\b"],
+                    "bands": [["<=", 1, 10], ["<=", 2, 8], ["<=", 4, 6]],
+                    "otherwise": 4
                 }
             },
             "vocabulary_ttr": {
                 "weight": 10,
                 "formula": "unique_words / total_words",
-                "levels": {
-                    "0.9-1.0": 10, "0.7-0.89": 8, "0.5-0.69": 6, "0.3-0.49": 4, "0-0.29": 2
-                }
+                "bands": [[">=", 0.9, 10], [">=", 0.7, 8], [">=", 0.5, 6], [">=", 0.3, 4]],
+                "otherwise": 2
             }
         }
     },
@@ -66,24 +91,26 @@ RUBRIC = {
         "weight": 15,
         "metric": "filler_word_rate",
         "formula": "(filler_count / total_words) * 100",
-        "filler_words": ["um", "uh", "like", "you know", "so", "actually", "basically", 
+        "filler_words": ["um", "uh", "like", "you know", "so", "actually", "basically",
                         "right", "i mean", "well", "kinda", "sort of", "okay", "hmm", "ah"],
-        "levels": {
-            "0-3": 15, "4-6": 12, "7-9": 9, "10-12": 6, "13+": 3
-        }
+        "bands": [["<=", 3, 15], ["<=", 6, 12], ["<=", 9, 9], ["<=", 12, 6]],
+        "otherwise": 3
     },
     "engagement": {
         "weight": 15,
-        "metric": "sentiment",
+        "metric": "positivity",
         "method": "VADER",
-        "categories": {
-            "positive": ["enthusiastic", "confident", "grateful"],
-            "neutral": ["factual", "calm"],
-            "negative": ["disinterested", "anxious", "dull"]
-        },
-        "levels": {
-            ">0.9": 15, "0.7-0.89": 12, "0.5-0.69": 9, "0.3-0.49": 6, "<0.3": 3
-        }
+        "formula": "(compound + 1) / 2",
+        "bands": [[">=", 0.9, 15], [">=", 0.7, 12], [">=", 0.5, 9], [">=", 0.3, 6]],
+        "otherwise": 3
+    },
+    "summary": {
+        "bands": [
+            [">=", 85, "Excellent introduction! Clear structure, good content coverage, and engaging delivery."],
+            [">=", 70, "Good introduction with room for improvement. Consider adding more details or improving flow."],
+            [">=", 50, "Satisfactory introduction. Focus on including more key information and improving structure."]
+        ],
+        "otherwise": "Needs improvement. Include essential details (name, age, school) and follow proper introduction flow."
     }
 }
 
@@ -93,4 +120,25 @@ SAMPLE_EXPECTED = {
     "sentence_count": 11,
     "duration_sec": 52,
     "expected_score": 86
-}
\ No newline at end of file
+}
+
+#extra phrasings used for semantic topic detection (ANALYZER_TOPIC_PARAPHRASES=1)
+TOPIC_PARAPHRASES = {
+    "name": ["my name is", "introducing myself by name"],
+    "age": ["how old I am", "I am years old"],
+    "school": ["the school and class I study in", "my grade at school"],
+    "family": ["my family members", "my parents and siblings"],
+    "hobbies": ["what I like to do in my free time", "my hobbies and interests"]
+}
+
+def topic_queries(topics, paraphrases=False, extra=None):
+    """Semantic queries per topic; the first query is always "student's <topic>" """
+    extra = TOPIC_PARAPHRASES if extra is None else extra
+    return {t: [f"student's {t}"] + (extra.get(t, []) if paraphrases else [])
+            for t in topics}
+
+def rubric_version(rubric=None, paraphrases=None):
+    """Short content hash of the rubric, used to key caches and persisted artifacts"""
+    payload = json.dumps([rubric if rubric is not None else RUBRIC,
+                          paraphrases if paraphrases is not None else TOPIC_PARAPHRASES], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
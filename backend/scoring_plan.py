@@ -0,0 +1,157 @@
+import re
+import operator
+from dataclasses import dataclass, replace
+from phrase_matcher import PhraseMatcher
+from topic_index import TopicIndex
+from rubric import topic_queries, rubric_version
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+
+class ThresholdTable:
+    """Ordered [op, bound, value] rows; the first row whose test passes wins"""
+
+    __slots__ = ("rows", "otherwise")
+
+    def __init__(self, bands, otherwise):
+        self.rows = tuple((OPERATORS[op], bound, value) for op, bound, value in bands)
+        self.otherwise = otherwise
+
+    def lookup(self, x):
+        for test, bound, value in self.rows:
+            if test(x, bound):
+                return value
+        return self.otherwise
+
+
+@dataclass(frozen=True)
+class ScoringPlan:
+    """Everything compiled from one rubric version. Never mutated; reloads swap in a new plan."""
+
+    version: str
+    matcher: PhraseMatcher
+    topic_queries: dict             # topic -> semantic query strings
+    topic_index: TopicIndex         # None until the embedding model is available
+    #content & structure
+    salutation_levels: tuple        # ((label, score), ...) best first
+    salutation_weight: int
+    must_have: tuple                # topic names, in rubric order
+    must_per_item: int
+    must_semantic_per_item: int
+    semantic_threshold: float
+    must_max: int
+    good_to_have: tuple
+    good_per_item: int
+    good_max: int
+    keyword_weight: int
+    flow: dict                      # part -> {"score", "within_first"/"within_last"}
+    flow_weight: int
+    #speech rate
+    default_min_seconds: int
+    default_words_per_second: float
+    ideal_wpm: tuple
+    speech_bands: ThresholdTable
+    speech_weight: int
+    #language & grammar
+    grammar_issue_types: frozenset
+    grammar_fallback_matches: int
+    grammar_bands: ThresholdTable
+    grammar_weight: int
+    basic_patterns: tuple
+    basic_bands: ThresholdTable
+    ttr_bands: ThresholdTable
+    ttr_weight: int
+    #clarity & engagement
+    filler_words: tuple
+    filler_bands: ThresholdTable
+    filler_weight: int
+    sentiment_bands: ThresholdTable
+    sentiment_weight: int
+    summary: ThresholdTable
+
+
+def compile_plan(rubric, encoder, model_name, cache_dir=None, paraphrases=False, extra_paraphrases=None):
+    """Build matchers, threshold tables and topic embeddings from a rubric dict.
+
+    With encoder=None the topic index is left out; add it later with
+    with_topic_index(). Raises KeyError/ValueError on a malformed rubric,
+    leaving the caller's current plan untouched.
+    """
+    content = rubric["content_structure"]["metrics"]
+    salutation = content["salutation"]
+    keywords = content["keywords"]
+    flow = content["flow"]
+    speech = rubric["speech_rate"]
+    grammar = rubric["language_grammar"]["metrics"]["grammar"]
+    ttr = rubric["language_grammar"]["metrics"]["vocabulary_ttr"]
+    clarity = rubric["clarity"]
+    engagement = rubric["engagement"]
+
+    #every phrase goes into one matcher; hits are grouped by scorer
+    entries = []
+    levels = sorted(salutation["levels"].items(), key=lambda kv: -kv[1]["score"])
+    for name, level in levels:
+        entries += [(p, "salutation", name.title()) for p in level["keywords"]]
+    for category, phrases in keywords["must_have"]["items"].items():
+        entries += [(p, "must_have", category) for p in phrases]
+    for category, phrases in keywords["good_to_have"]["items"].items():
+        entries += [(p, "good_to_have", category) for p in phrases]
+    for part, group in (("greeting", "greeting"), ("name", "name_intro"), ("closing", "closing")):
+        entries += [(p, group, p) for p in flow[part]["keywords"]]
+    entries += [(p, "filler", p) for p in clarity["filler_words"]]
+
+    version = rubric_version(rubric, extra_paraphrases)
+    must_have = tuple(keywords["must_have"]["items"])
+    queries = topic_queries(must_have, paraphrases, extra_paraphrases)
+    topic_index = None
+    if encoder is not None:
+        topic_index = TopicIndex.load_or_build(encoder, queries, model_name, version, cache_dir)
+
+    basic = grammar["basic"]
+    return ScoringPlan(
+        version=version,
+        matcher=PhraseMatcher(entries),
+        topic_queries=queries,
+        topic_index=topic_index,
+        salutation_levels=tuple((name.title(), level["score"]) for name, level in levels if level["keywords"]),
+        salutation_weight=salutation["weight"],
+        must_have=must_have,
+        must_per_item=keywords["must_have"]["per_item"],
+        must_semantic_per_item=keywords["must_have"]["semantic_per_item"],
+        semantic_threshold=keywords["must_have"]["semantic_threshold"],
+        must_max=keywords["must_have"]["max_score"],
+        good_to_have=tuple(keywords["good_to_have"]["items"]),
+        good_per_item=keywords["good_to_have"]["per_item"],
+        good_max=keywords["good_to_have"]["max_score"],
+        keyword_weight=keywords["weight"],
+        flow={part: {k: v for k, v in flow[part].items() if k != "keywords"}
+              for part in ("greeting", "name", "closing")},
+        flow_weight=flow["weight"],
+        default_min_seconds=speech["default_duration"]["min_seconds"],
+        default_words_per_second=speech["default_duration"]["words_per_second"],
+        ideal_wpm=tuple(speech["ideal"]),
+        speech_bands=ThresholdTable(speech["bands"], speech["otherwise"]),
+        speech_weight=speech["weight"],
+        grammar_issue_types=frozenset(t.lower() for t in grammar["counted_issue_types"]),
+        grammar_fallback_matches=grammar["fallback_max_matches"],
+        grammar_bands=ThresholdTable(grammar["bands"], grammar["otherwise"]),
+        grammar_weight=grammar["weight"],
+        basic_patterns=tuple(re.compile(p) for p in basic["patterns"]),
+        basic_bands=ThresholdTable(basic["bands"], basic["otherwise"]),
+        ttr_bands=ThresholdTable(ttr["bands"], ttr["otherwise"]),
+        ttr_weight=ttr["weight"],
+        filler_words=tuple(clarity["filler_words"]),
+        filler_bands=ThresholdTable(clarity["bands"], clarity["otherwise"]),
+        filler_weight=clarity["weight"],
+        sentiment_bands=ThresholdTable(engagement["bands"], engagement["otherwise"]),
+        sentiment_weight=engagement["weight"],
+        summary=ThresholdTable(rubric["summary"]["bands"], rubric["summary"]["otherwise"])
+    )
+
+
+def with_topic_index(plan, encoder, model_name, cache_dir=None):
+    """Copy of plan with its topic embeddings loaded or built"""
+    if plan.topic_index is not None:
+        return plan
+    index = TopicIndex.load_or_build(encoder, plan.topic_queries, model_name, plan.version, cache_dir)
+    return replace(plan, topic_index=index)
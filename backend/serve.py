@@ -0,0 +1,160 @@
+"""Serve the API from several worker processes that share one loaded copy of the models.
+
+    python serve.py --workers 4
+    python serve.py --workers 8 --host 0.0.0.0 --port 8000 --threads 1
+
+`uvicorn main:app --workers N` starts N fresh interpreters, and each one loads
+its own embedding model, VADER lexicon and LanguageTool server. This launcher
+instead imports main once in a parent process. That loads every component
+eagerly and runs the warm-up analysis. It then forks the workers, which
+inherit the loaded models copy-on-write. The pages holding model weights and
+lexicons are never written, so they stay shared no matter how many workers
+run. All workers accept connections on the same listening socket.
+
+LanguageTool is shared too. With ANALYZER_LT_URLS set, every worker talks to
+those servers. Otherwise the parent starts ANALYZER_LT_POOL_SIZE local servers
+before forking, and all workers send their checks there. Each worker still
+has its own request queue, so up to workers x pool size checks reach the
+servers at once. The parent restarts a worker that dies. On SIGTERM or
+SIGINT it stops the workers gracefully, then shuts down LanguageTool.
+
+Per-process state (metrics, cache hit counters, the rubric plan after
+POST /admin/rubric/reload) belongs to the worker that served the request.
+Cohort sketches are per worker too until the next save merges them into
+ANALYZER_COHORT_FILE, where every worker picks them up.
+Use benchmarks/bench_memory.py to measure RSS and PSS per worker against
+plain uvicorn.
+"""
+import gc
+#no collections while loading: freed objects would leave holes in pages the workers share
+gc.disable()
+
+import os
+import time
+import signal
+import argparse
+import traceback
+
+#HF tokenizers warns (and turns parallelism off) in every forked worker otherwise
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def load(args):
+    """Import the app in this process and load everything the workers will share"""
+    import main
+    analyzer = main.analyzer
+    analyzer.start_loading(warm_up=not args.no_warmup)
+    for component in analyzer._components.values():
+        component.wait()
+    if not args.no_warmup:
+        analyzer.warmup.wait()
+    for name, component in analyzer.status()["components"].items():
+        if component["state"] == "failed":
+            print(f"Warning: {name} failed to load, workers will run without it: {component['error']}")
+
+
+def run_worker(uvicorn_config, sock, threads):
+    import uvicorn
+    from metrics import REGISTRY
+    import main
+    #Ctrl+C reaches the parent only, which then stops each worker once
+    os.setpgid(0, 0)
+    gc.enable()
+    main.analyzer.after_fork(threads)
+    REGISTRY.after_fork()
+    main.cohort_store.after_fork()
+    uvicorn.Server(uvicorn_config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Forks the workers and restarts any that exit until asked to stop"""
+
+    def __init__(self, uvicorn_config, sock, workers, threads, restart_delay=1.0):
+        self.uvicorn_config = uvicorn_config
+        self.sock = sock
+        self.count = workers
+        self.threads = threads
+        self.restart_delay = restart_delay
+        self.workers = set()
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            #the parent's handlers forward signals to workers; a worker just shuts itself down
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.uvicorn_config, self.sock, self.threads)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                #skip the parent's atexit handlers, which would stop the shared LanguageTool servers
+                os._exit(code)
+        self.workers.add(pid)
+        print(f"Started worker {pid}")
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        print(f"Stopping {len(self.workers)} workers...")
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.count):
+            self.spawn()
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid not in self.workers:
+                continue
+            self.workers.discard(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+            print(f"Worker {pid} exited with status {code}; restarting")
+            time.sleep(self.restart_delay)
+            if not self.stopping:
+                self.spawn()
+        self.sock.close()
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Pre-forking multi-worker server for the analyzer API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=cpus)
+    parser.add_argument("--threads", type=int, default=0,
+                        help="embedding intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--no-warmup", action="store_true", help="skip the warm-up analysis before forking")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn_config = uvicorn.Config("main:app", host=args.host, port=args.port, log_level=args.log_level)
+    #bind before loading the models so a busy port fails in seconds, not minutes
+    sock = uvicorn_config.bind_socket()
+
+    load(args)
+    #keep the loaded objects out of every future collection, so the workers' collector never writes to them
+    gc.collect()
+    gc.freeze()
+    threads = args.threads or max(cpus // args.workers, 1)
+    print(f"Models loaded; forking {args.workers} workers ({threads} embedding threads each)")
+    Supervisor(uvicorn_config, sock, args.workers, threads).run()
+
+
+if __name__ == "__main__":
+    main()
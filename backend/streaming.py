@@ -0,0 +1,158 @@
+import numpy as np
+from collections import Counter
+from nltk.tokenize import word_tokenize, sent_tokenize
+from document import ParsedDocument
+
+#a tail longer than this is committed even without a sentence boundary
+MAX_PENDING_CHARS = 2000
+
+
+class StreamingSession:
+    """Scores a transcript that arrives in chunks, e.g. from live captioning.
+
+    Text is buffered until sent_tokenize sees a complete sentence; each
+    committed sentence is parsed once and folded into running counts, so an
+    update costs work proportional to the new text, not the whole transcript.
+    Updates use the basic grammar check and a running mean of sentence
+    embeddings for semantic keywords; finish() scores the full text through
+    TranscriptAnalyzer.analyze() so the final result matches POST /analyze.
+    """
+
+    def __init__(self, analyzer, plan):
+        self.analyzer = analyzer
+        self.plan = plan
+        self._sentences = []        # committed sentences, joined with spaces only when needed
+        self._text_chars = 0        # length of the committed text
+        self._pending = ""
+        self.bytes_received = 0     # UTF-8 size of every chunk fed so far
+        self.sentence_count = 0
+        self.word_count = 0
+        self.alpha_count = 0
+        self.alpha_freq = Counter()
+        self.salutations = set()
+        self.must_hits = set()
+        self.good_hits = set()
+        self.has_greeting = False
+        self.has_name_early = False
+        self.closing_starts = []
+        self.filler_count = 0
+        self.grammar_errors = 0
+        self._compound_sum = 0.0
+        self._embedding_sum = None
+        self._unembedded = []       # committed sentences not yet in _embedding_sum
+
+    @property
+    def text(self):
+        """The committed text"""
+        return " ".join(self._sentences)
+
+    @property
+    def transcript(self):
+        """Everything received so far, including the uncommitted tail"""
+        return (self.text + " " + self._pending).strip()
+
+    def feed(self, chunk: str, elapsed_seconds: float = None):
+        """Add a chunk of transcript and return the updated result"""
+        self.bytes_received += len(chunk.encode("utf-8"))
+        self._pending += chunk
+        sentences = sent_tokenize(self._pending)
+        if len(self._pending) > MAX_PENDING_CHARS:
+            self._commit(sentences)
+            self._pending = ""
+        elif len(sentences) > 1:
+            #the last sentence may still be growing; keep it (with its offset) as the tail
+            spans = ParsedDocument._spans(self._pending, sentences)
+            self._commit(sentences[:-1])
+            self._pending = self._pending[spans[-1][0]:]
+        return self.result(elapsed_seconds)
+
+    def finish(self, elapsed_seconds: float = None, use_cache: bool = True, include_timings: bool = False,
+               budget_ms: float = None):
+        """Score the whole transcript, including any uncommitted tail"""
+        duration = int(elapsed_seconds) if elapsed_seconds else None
+        result = dict(self.analyzer.analyze(self.transcript, duration, use_cache=use_cache,
+                                            include_timings=include_timings, budget_ms=budget_ms))
+        result["type"] = "final"
+        return result
+
+    def _commit(self, sentences):
+        plan = self.plan
+        flow = plan.flow
+        sia = self.analyzer.sia
+        for sent in sentences:
+            sent = sent.strip()
+            if not sent:
+                continue
+            offset = self._text_chars + 1 if self._sentences else 0
+            self._sentences.append(sent)
+            self._text_chars = offset + len(sent)
+            lower = sent.lower()
+
+            hits = plan.matcher.group_hits(lower)
+            self.salutations.update(h.label for h in hits.get("salutation", []))
+            self.must_hits.update(h.label for h in hits.get("must_have", []))
+            self.good_hits.update(h.label for h in hits.get("good_to_have", []))
+            if any(offset + h.end <= flow["greeting"]["within_first"] for h in hits.get("greeting", [])):
+                self.has_greeting = True
+            if any(offset + h.end <= flow["name"]["within_first"] for h in hits.get("name_intro", [])):
+                self.has_name_early = True
+            self.closing_starts += [offset + h.start for h in hits.get("closing", [])]
+            self.filler_count += len(hits.get("filler", []))
+
+            for token in word_tokenize(lower):
+                if token.isalnum():
+                    self.word_count += 1
+                if token.isalpha():
+                    self.alpha_count += 1
+                    self.alpha_freq[token] += 1
+            if not sent[0].isupper():
+                self.grammar_errors += 1
+            if sent[-1] not in '.!?':
+                self.grammar_errors += 1
+            for pat in plan.basic_patterns:
+                self.grammar_errors += len(pat.findall(lower))
+            self._compound_sum += sia.polarity_scores(sent)['compound']
+            self._unembedded.append(sent)
+            self.sentence_count += 1
+
+    def _similarities(self):
+        #only pay for embeddings while some must-have topic is still missing lexically
+        if all(category in self.must_hits for category in self.plan.must_have):
+            return None
+        if self._unembedded:
+            vectors = self.analyzer.model.encode(self._unembedded, normalize_embeddings=True)
+            total = np.sum(vectors, axis=0)
+            self._embedding_sum = total if self._embedding_sum is None else self._embedding_sum + total
+            self._unembedded = []
+        if self._embedding_sum is None:
+            return None
+        norm = np.linalg.norm(self._embedding_sum)
+        if not norm:
+            return None
+        return self.analyzer._topic_similarities(self._embedding_sum / norm, self.plan)
+
+    def result(self, elapsed_seconds: float = None):
+        """Current scores for the committed text"""
+        analyzer = self.analyzer
+        plan = self.plan
+        word_count = self.word_count
+        duration = int(elapsed_seconds) if elapsed_seconds else analyzer._default_duration(word_count, plan)
+        wpm = (word_count / max(duration, 1)) * 60
+        closing_from = max(self._text_chars - plan.flow["closing"]["within_last"], 0)
+        compound = self._compound_sum / self.sentence_count if self.sentence_count else 0.0
+
+        criteria = [
+            analyzer._salutation_result(self.salutations, plan),
+            analyzer._keyword_result(self.must_hits, self.good_hits, self._similarities(), plan),
+            analyzer._flow_result(self.has_greeting, self.has_name_early,
+                                  any(s >= closing_from for s in self.closing_starts), plan),
+            analyzer._score_speech_rate(wpm, duration, plan),
+            analyzer._grammar_basic_result(self.grammar_errors, word_count, plan),
+            analyzer._vocabulary_result(len(self.alpha_freq), self.alpha_count, plan),
+            analyzer._filler_result(self.filler_count, word_count, plan),
+            analyzer._sentiment_result(compound, plan)
+        ]
+        result = analyzer._combine(criteria, word_count, self.sentence_count, plan)
+        result["type"] = "update"
+        result["pending_chars"] = len(self._pending)
+        return result
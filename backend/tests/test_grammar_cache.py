@@ -0,0 +1,70 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import lt_stub_server
+from grammar_cache import GrammarCache, check_incremental, match_dict
+
+calls = []
+
+
+def check(text):
+    """The stub server's rules, returned as language_tool_python-like matches"""
+    calls.append(text)
+    return [SimpleNamespace(offset=m["offset"], errorLength=m["length"], ruleId=m["rule"]["id"],
+                            ruleIssueType=m["rule"]["issueType"], message=m["message"])
+            for m in lt_stub_server.check_text(text)["matches"]]
+
+
+def spans(text):
+    return [m.span() for m in re.finditer(r'\S.*?(?:[.!?](?=\s|$)|$)', text)]
+
+
+def full(text):
+    return [match_dict(m) for m in check(text)]
+
+
+def incremental(text, cache):
+    return check_incremental(check, text, spans(text), cache)
+
+
+BASE = "Hello everyone. i is a student at the school. My hobby is chess. he are my friend."
+
+CHANGES = {
+    "append": BASE + " we is here. thank you.",
+    "edit": BASE.replace("My hobby is chess.", "my hobby is chess and i play daily."),
+    "reorder": "he are my friend. Hello everyone. My hobby is chess. i is a student at the school.",
+    "whitespace": BASE.replace(". ", ".   ").replace("chess.", "chess.\n\n") + "  ",
+}
+
+
+@pytest.mark.parametrize("change", sorted(CHANGES))
+def test_incremental_matches_full_check(change):
+    cache = GrammarCache(max_entries=100)
+    incremental(BASE, cache)
+    text = CHANGES[change]
+    matches, cached, checked = incremental(text, cache)
+    assert matches == full(text)
+    assert cached > 0
+
+
+def test_whitespace_only_change_is_fully_cached():
+    cache = GrammarCache(max_entries=100)
+    incremental(BASE, cache)
+    calls.clear()
+    _, cached, checked = incremental(CHANGES["whitespace"], cache)
+    assert (checked, calls) == (0, [])
+    assert cached == len(spans(BASE))
+
+
+def test_uncached_runs_are_checked_separately_with_context():
+    cache = GrammarCache(max_entries=100)
+    incremental("One. Two. Three. Four.", cache)
+    calls.clear()
+    matches, cached, checked = incremental("One. two. Three. four.", cache)
+    #each edited sentence is checked after its cached neighbour, never joined to the other edit
+    assert calls == ["One. two.", "Three. four."]
+    assert (cached, checked) == (2, 2)
+    assert [m["offset"] for m in matches] == [5, 17]
+    assert matches == full("One. two. Three. four.")
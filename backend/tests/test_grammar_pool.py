@@ -0,0 +1,136 @@
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import config
+import lt_stub_server
+from analyzer import TranscriptAnalyzer
+from components import LazyComponent
+from grammar_cache import GrammarCache, match_dict
+from grammar_pool import LanguageToolPool, PoolSaturated, PoolTimeout
+
+TEXT = "Hello everyone. i is a student. My hobby is chess."
+
+
+@pytest.fixture
+def stub(request):
+    """A running stub server; parametrize indirectly with the per-check delay in seconds"""
+    server, url = lt_stub_server.start(delay=getattr(request, "param", 0.0))
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    #nothing is loaded until a component is used; the grammar component is swapped per test
+    return TranscriptAnalyzer(lazy=True)
+
+
+def use_pool(analyzer, loader):
+    component = LazyComponent("grammar", loader)
+    analyzer._components["grammar"] = component
+    return component
+
+
+def make_doc(text):
+    """The parts of a ParsedDocument the grammar stage reads (no NLTK data needed)"""
+    sentences = [s.strip() + "." for s in text.split(".") if s.strip()]
+    spans, pos = [], 0
+    for sentence in sentences:
+        start = text.index(sentence, pos)
+        spans.append((start, start + len(sentence)))
+        pos = start + len(sentence)
+    return SimpleNamespace(text=text, lower=text.lower(), sentences=sentences, sentence_spans=spans,
+                           word_count=len(text.split()))
+
+
+def score(analyzer, text=TEXT, use_cache=False):
+    return analyzer._score_grammar_languagetool(make_doc(text), analyzer.plan, use_cache=use_cache)
+
+
+def occupy(pool, n):
+    """Start n checks in the background so the backend is busy and n - 1 callers are queued"""
+    threads = [threading.Thread(target=pool.check, args=(TEXT,)) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    return threads
+
+
+def test_check(stub, analyzer):
+    pool = LanguageToolPool.from_config(urls=[stub], max_queue=2, timeout=5)
+    rules = {match_dict(m)["rule_id"] for m in pool.check(TEXT)}
+    assert {"I_LOWERCASE", "SUBJECT_VERB_AGREEMENT"} <= rules
+    assert pool.stats()["calls"] == 1
+
+    use_pool(analyzer, lambda: pool)
+    result = score(analyzer)
+    assert result["details"]["method"] == "languagetool"
+    assert result["details"]["error_count"] >= 2
+    assert "degraded" not in result["details"]
+
+
+@pytest.mark.parametrize("stub", [0.5], indirect=True)
+@pytest.mark.parametrize("behaviour", ["fallback", "reject"])
+def test_saturated(stub, analyzer, behaviour, monkeypatch):
+    pool = LanguageToolPool.from_config(urls=[stub], max_queue=1, timeout=5)
+    use_pool(analyzer, lambda: pool)
+    monkeypatch.setattr(config, "LT_ON_SATURATION", behaviour)
+    threads = occupy(pool, 2)
+    try:
+        with pytest.raises(PoolSaturated):
+            pool.check(TEXT)
+        if behaviour == "reject":
+            with pytest.raises(PoolSaturated):
+                score(analyzer)
+        else:
+            result = score(analyzer)
+            assert result["details"]["method"] == "basic"
+            assert result["details"]["degraded"] == "saturated"
+        assert pool.stats()["rejected"] == 2
+    finally:
+        for thread in threads:
+            thread.join()
+
+
+@pytest.mark.parametrize("stub", [0.5], indirect=True)
+def test_timeout_falls_back_to_basic(stub, analyzer):
+    pool = LanguageToolPool.from_config(urls=[stub], max_queue=2, timeout=0.1)
+    with pytest.raises(PoolTimeout):
+        pool.check(TEXT)
+
+    use_pool(analyzer, lambda: pool)
+    result = score(analyzer)
+    assert result["details"]["method"] == "basic"
+    assert result["details"]["degraded"] == "timeout"
+    assert pool.stats()["timeouts"] == 2
+
+
+@pytest.mark.parametrize("stub", [0.3], indirect=True)
+def test_timeout_covers_every_uncached_run(stub, analyzer, monkeypatch):
+    pool = LanguageToolPool.from_config(urls=[stub], max_queue=2, timeout=0.5)
+    use_pool(analyzer, lambda: pool)
+    monkeypatch.setattr(analyzer, "grammar_cache", GrammarCache(max_entries=100))
+    assert "degraded" not in score(analyzer, "Hello everyone. My hobby is chess.", use_cache=True)["details"]
+
+    #two uncached runs of 0.3s each: the second gets only what the first left of the 0.5s
+    start = time.monotonic()
+    result = score(analyzer, "Hello everyone. i is new. My hobby is chess. he are here.", use_cache=True)
+    assert result["details"]["degraded"] == "timeout"
+    assert time.monotonic() - start < 0.6
+
+
+def test_server_down_is_unavailable(analyzer):
+    server, url = lt_stub_server.start()
+    server.shutdown()
+    server.server_close()
+    component = use_pool(analyzer, lambda: LanguageToolPool.from_config(urls=[url]))
+    component.start().wait()
+    assert component.state == "failed"
+
+    result = score(analyzer)
+    assert result["details"]["method"] == "basic"
+    assert result["details"]["degraded"] == "unavailable"
@@ -0,0 +1,42 @@
+import sqlite3
+
+from result_cache import ResultCache
+
+
+def rows(path):
+    with sqlite3.connect(path) as db:
+        return [key for key, in db.execute("SELECT key FROM results ORDER BY rowid")]
+
+
+def test_disk_tier_keeps_latest_writes(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    cache = ResultCache(max_entries=2, db_path=path, max_disk_entries=3)
+    for i in range(5):
+        cache.put(f"k{i}", {"i": i})
+    assert rows(path) == ["k2", "k3", "k4"]
+
+    #a rewritten result counts as the latest write
+    cache.put("k2", {"i": 2})
+    cache.put("k5", {"i": 5})
+    assert rows(path) == ["k4", "k2", "k5"]
+
+    #a smaller cap is applied when the file is reopened
+    ResultCache(db_path=path, max_disk_entries=1)
+    assert rows(path) == ["k5"]
+
+
+def test_unbounded_disk_tier(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    cache = ResultCache(max_entries=1, db_path=path)
+    for i in range(5):
+        cache.put(f"k{i}", {"i": i})
+    assert len(rows(path)) == 5
+    assert cache.get("k0") == {"i": 0}
+
+
+def test_key_includes_settings():
+    key = ResultCache.make_key("Hello there.", 60, "v1", "model")
+    assert key == ResultCache.make_key("  Hello there. ", 60, "v1", "model")
+    assert key != ResultCache.make_key("Hello there.", 60, "v1", "model", (True, "off"))
+    assert (ResultCache.make_key("Hello there.", 60, "v1", "model", (False, "off"))
+            != ResultCache.make_key("Hello there.", 60, "v1", "model", (False, "auto")))
@@ -0,0 +1,99 @@
+import os
+import re
+import hashlib
+import numpy as np
+
+
+class TopicIndex:
+    """Precomputed topic embeddings held as one (rows x dim) matrix.
+
+    Rows are grouped by topic, so a single matrix-vector product scores a
+    transcript embedding against every topic and its paraphrases at once.
+    """
+
+    def __init__(self, topics, offsets, matrix):
+        self.topics = topics          # topic names, in row-group order
+        self.offsets = offsets        # start row of each topic group
+        self.matrix = matrix          # L2-normalized float32 embeddings
+
+    @classmethod
+    def load_or_build(cls, model, queries, model_name, rubric_version, cache_dir=None):
+        """Load the index from cache_dir, encoding and saving it on a miss.
+
+        queries: {topic: [query, paraphrase, ...]}
+        """
+        topics = list(queries)
+        offsets, rows = [], []
+        for topic in topics:
+            offsets.append(len(rows))
+            rows.extend(queries[topic])
+        offsets = np.array(offsets, dtype=np.intp)
+
+        path = None
+        if cache_dir:
+            path = os.path.join(cache_dir, cls._filename(rows, model_name, rubric_version))
+            if os.path.exists(path):
+                try:
+                    matrix = np.load(path, mmap_mode='r')
+                    if matrix.shape[0] == len(rows):
+                        return cls(topics, offsets, matrix)
+                except (OSError, ValueError) as e:
+                    print(f"Topic index load error: {e}")
+
+        matrix = np.asarray(model.encode(rows, normalize_embeddings=True), dtype=np.float32)
+        if path:
+            cls._save(path, matrix)
+        return cls(topics, offsets, matrix)
+
+    @staticmethod
+    def _filename(rows, model_name, rubric_version):
+        digest = hashlib.sha256("\n".join(rows).encode("utf-8")).hexdigest()[:12]
+        model_slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        return f"topics-{model_slug}-{rubric_version}-{digest}.npy"
+
+    @staticmethod
+    def _save(path, matrix):
+        #write to a temp file first so concurrent workers never see a partial array
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, matrix)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Topic index save error: {e}")
+
+    def similarities(self, embedding):
+        """Cosine similarity of a normalized embedding to each topic (max over paraphrases)"""
+        sims = self.matrix @ np.asarray(embedding, dtype=np.float32)
+        best = np.maximum.reduceat(sims, self.offsets)
+        return dict(zip(self.topics, best.tolist()))
+
+    def best_matches(self, encoder, chunks, batch_size=32, top_k=1):
+        """Score each topic against many text chunks, encoding batch_size chunks at a time.
+
+        A topic's score is the mean of its top_k chunk similarities. Only the
+        running top_k per topic is kept between batches, so memory does not
+        grow with the number of chunks. Returns {topic: (score, best_chunk_index)}.
+        """
+        top_k = max(1, top_k)
+        best = np.empty((0, len(self.topics)), dtype=np.float32)
+        best_idx = np.empty((0, len(self.topics)), dtype=np.intp)
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            embeddings = np.asarray(encoder.encode(batch, batch_size=batch_size, normalize_embeddings=True),
+                                    dtype=np.float32)
+            sims = np.maximum.reduceat(embeddings @ self.matrix.T, self.offsets, axis=1)
+            idx = np.broadcast_to(np.arange(start, start + len(batch))[:, None], sims.shape)
+            best = np.vstack([best, sims])
+            best_idx = np.vstack([best_idx, idx])
+            if best.shape[0] > top_k:
+                order = np.argsort(-best, axis=0, kind="stable")[:top_k]
+                best = np.take_along_axis(best, order, axis=0)
+                best_idx = np.take_along_axis(best_idx, order, axis=0)
+        if not best.shape[0]:
+            return {}
+        scores = best.mean(axis=0)
+        order = np.argmax(best, axis=0)
+        top = best_idx[order, np.arange(len(self.topics))]
+        return {topic: (float(scores[t]), int(top[t])) for t, topic in enumerate(self.topics)}
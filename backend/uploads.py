@@ -0,0 +1,86 @@
+import zlib
+import codecs
+import zipfile
+import posixpath
+
+READ_CHUNK = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload or archive entry exceeds its size cap"""
+
+
+class TextDecoder:
+    """Incremental UTF-8 decoding with a byte cap, so oversized input fails
+    after max_bytes instead of being read into memory first. A leading BOM is dropped."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._parts = []
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"Transcript larger than {self.max_bytes} bytes")
+        self._parts.append(self._decoder.decode(chunk))
+
+    def text(self):
+        self._parts.append(self._decoder.decode(b"", final=True))
+        return "".join(self._parts)
+
+
+async def read_text_upload(upload, max_bytes):
+    """Decode an UploadFile chunk by chunk, failing as soon as it passes max_bytes"""
+    decoder = TextDecoder(max_bytes)
+    while True:
+        chunk = await upload.read(READ_CHUNK)
+        if not chunk:
+            return decoder.text()
+        decoder.feed(chunk)
+
+
+def _skipped(name):
+    #folders, and the metadata macOS and Windows add to archives
+    base = posixpath.basename(name.rstrip("/"))
+    return name.endswith("/") or name.startswith("__MACOSX/") or base.startswith(".") or base == "Thumbs.db"
+
+
+def open_archive(fileobj, max_entries):
+    """Open a zip upload and list its transcript entries; raises zipfile.BadZipFile or UploadTooLarge"""
+    archive = zipfile.ZipFile(fileobj)
+    entries = [info for info in archive.infolist() if not _skipped(info.filename)]
+    if len(entries) > max_entries:
+        archive.close()
+        raise UploadTooLarge(f"Archive has {len(entries)} files (maximum {max_entries})")
+    return archive, entries
+
+
+def iter_archive(archive, entries, max_bytes):
+    """Yield (name, transcript, error) per entry, reading one entry at a time.
+
+    Entries are decompressed in chunks and stop at max_bytes of output, so
+    neither a large archive nor a zip bomb is ever held in memory.
+    """
+    for info in entries:
+        name = info.filename
+        if not name.lower().endswith(".txt"):
+            yield name, None, "Only .txt files are supported"
+            continue
+        if info.file_size > max_bytes:
+            yield name, None, f"Transcript larger than {max_bytes} bytes"
+            continue
+        decoder = TextDecoder(max_bytes)
+        try:
+            with archive.open(info) as f:
+                for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                    decoder.feed(chunk)
+            yield name, decoder.text(), None
+        except UploadTooLarge as e:
+            yield name, None, str(e)
+        except UnicodeDecodeError:
+            yield name, None, "File encoding error. Please use UTF-8 encoded .txt file"
+        except (zipfile.BadZipFile, zlib.error, RuntimeError, OSError, EOFError) as e:
+            #corrupt, encrypted or truncated entry
+            yield name, None, f"Could not extract: {e}"